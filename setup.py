@@ -13,6 +13,7 @@ setup(
         'requests',
         'xarray',
         'shapely',
+        'scipy',
         'owslib'
     ],
     description='Python package for processing and analyzing hydrological data.',
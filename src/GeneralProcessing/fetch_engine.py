@@ -0,0 +1,137 @@
+"""
+HTTP Fetch Engine
+===============================================
+fetch_engine.py contains a class FetchEngine that runs many HTTP GET requests
+concurrently over one pooled ``requests.Session``. It is used by
+GenStreamflowFile for all station downloads.
+
+- A bounded thread pool runs the requests (`max_workers`).
+- Connections are kept alive and reused per host through the session's
+  connection pool instead of opening a new TCP/TLS connection per request.
+- Requests to the same host are spaced to at most `rate_limit` per second.
+- Connection errors, timeouts, HTTP 429 and 5xx responses are retried with
+  exponential backoff, honouring a ``Retry-After`` header when one is sent.
+
+Example Usage
+-------------
+>>> from GeneralProcessing.fetch_engine import FetchEngine
+>>> engine = FetchEngine(max_workers=8, rate_limit=10)
+>>> r = engine.get("https://waterservices.usgs.gov/nwis/dv/", params={'sites': '06132200'})
+>>> texts = engine.map(lambda st: engine.get(url, params={'sites': st}).text, stations)
+"""
+
+import time
+import random
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+# HTTP status codes retried with backoff
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+class FetchEngine:
+    """
+    Concurrent, connection-pooled, rate-limited HTTP GET engine with retries.
+
+    Parameters
+    ----------
+    max_workers : int
+        Number of concurrent requests (threads). 1 runs everything serially.
+    retries : int
+        Number of retries after the first attempt of a request.
+    backoff : float
+        Base backoff in seconds; attempt ``k`` waits ``backoff * 2**k`` plus jitter.
+    max_backoff : float
+        Upper bound of a single backoff wait in seconds.
+    rate_limit : float or None
+        Maximum requests per second to any single host (None = unlimited).
+    timeout : float
+        Timeout in seconds of each request.
+    session : requests.Session, optional
+        Session to use; by default a new session with a connection pool of
+        ``max_workers`` connections per host.
+    """
+
+    def __init__(self, max_workers=8, retries=4, backoff=1.0, max_backoff=60.0,
+                 rate_limit=None, timeout=120, session=None):
+        self.max_workers = max(1, int(max_workers))
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_limit = rate_limit
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=self.max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def get(self, url, params=None, headers=None):
+        """
+        GET a URL, retrying transient failures.
+
+        Returns the final ``requests.Response``; after the retries are used up
+        this may still be a 429/5xx response, so callers check the status as
+        they would for ``requests.get``. Connection errors and timeouts are
+        re-raised after the last attempt.
+        """
+        for attempt in range(self.retries + 1):
+            self._wait_for_slot(url)
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                print(f"Request to {url} failed ({e.__class__.__name__}); retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.retries:
+                    return response
+                delay = self._retry_after(response) or self._backoff_delay(attempt)
+                print(f"Request to {url} returned {response.status_code}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def map(self, func, items):
+        """
+        Apply ``func`` to every item concurrently and return the results in item order.
+
+        The first exception raised by ``func`` is re-raised.
+        """
+        items = list(items)
+        if self.max_workers == 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            return list(pool.map(func, items))
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
+
+    def _wait_for_slot(self, url):
+        """Block until the per-host rate limit allows another request to ``url``."""
+        if not self.rate_limit:
+            return
+        host = urlsplit(url).netloc
+        interval = 1.0 / self.rate_limit
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _backoff_delay(self, attempt):
+        """Exponential backoff with jitter for the given (0-based) attempt."""
+        return min(self.max_backoff, self.backoff * 2 ** attempt) * (0.5 + random.random() / 2)
+
+    def _retry_after(self, response):
+        """Seconds requested by a numeric ``Retry-After`` header, if any."""
+        try:
+            return min(self.max_backoff, float(response.headers.get('Retry-After')))
+        except (TypeError, ValueError):
+            return None
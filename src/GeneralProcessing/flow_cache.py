@@ -0,0 +1,185 @@
+"""
+Streamflow Cache
+===============================================
+flow_cache.py contains a class FlowCache, a persistent SQLite cache of
+downloaded streamflow records and station metadata used by GenStreamflowFile.
+
+Records are stored per (source, station, time), where the source names the
+service and parameter (e.g. 'usgs-dv-00060-00003'). For every download the
+requested time span is recorded, so a later request only fetches the parts of
+its span that are not covered yet:
+
+- spans that end more than `provisional_days` ago hold final data and never expire;
+- more recent spans, realtime data and station metadata expire after `ttl_hours`;
+- in offline mode nothing expires and nothing is fetched.
+
+Example Usage
+-------------
+>>> from GeneralProcessing.gen_streamflow_file import GenStreamflowFile
+>>> from GeneralProcessing.flow_cache import FlowCache
+>>> gen_flow = GenStreamflowFile(cache="streamflow_cache.sqlite")
+>>> offline = GenStreamflowFile(cache=FlowCache("streamflow_cache.sqlite", offline=True))
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import pandas as pd
+
+# ISO format of the times stored in the cache (naive UTC)
+_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+class FlowCache:
+    """
+    SQLite-backed cache of streamflow records and station metadata.
+
+    Parameters
+    ----------
+    path : str
+        Path of the SQLite database (created if missing).
+    ttl_hours : float
+        Lifetime of provisional spans, realtime spans and metadata.
+    provisional_days : float
+        Spans ending within this many days of now are provisional.
+    offline : bool
+        If True, never report missing spans or stale entries, so callers only
+        read what is already cached.
+    """
+
+    def __init__(self, path, ttl_hours=24, provisional_days=365, offline=False):
+        self.path = path
+        self.ttl_hours = ttl_hours
+        self.provisional_days = provisional_days
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS records (
+                    source TEXT, station TEXT, time TEXT, key TEXT, value REAL,
+                    PRIMARY KEY (source, station, time));
+                CREATE TABLE IF NOT EXISTS coverage (
+                    source TEXT, station TEXT, start TEXT, end TEXT, fetched REAL);
+                CREATE INDEX IF NOT EXISTS coverage_station ON coverage (source, station);
+                CREATE TABLE IF NOT EXISTS metadata (
+                    source TEXT, station TEXT, meta TEXT, fetched REAL,
+                    PRIMARY KEY (source, station));
+            ''')
+
+    def missing_spans(self, source, station, start, end, provisional=False):
+        """
+        Return the parts of [start, end) not covered by fresh cached spans.
+
+        Parameters
+        ----------
+        source, station : str
+            Cache key.
+        start, end : str or datetime-like
+            Half-open requested span.
+        provisional : bool
+            Treat the whole span as provisional (e.g. realtime data), so cached
+            parts expire after ``ttl_hours`` regardless of their age.
+
+        Returns
+        -------
+        list of (pd.Timestamp, pd.Timestamp)
+        """
+        start, end = _timestamp(start), _timestamp(end)
+        if self.offline:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT start, end, fetched FROM coverage '
+                'WHERE source = ? AND station = ? AND end > ? AND start < ?',
+                (source, station, _iso(start), _iso(end))
+            ).fetchall()
+        covered = sorted((_timestamp(s), _timestamp(e)) for s, e, fetched in rows
+                         if self._is_fresh(_timestamp(e), fetched, provisional))
+        missing = []
+        cursor = start
+        for s, e in covered:
+            if s > cursor:
+                missing.append((cursor, min(s, end)))
+            cursor = max(cursor, e)
+            if cursor >= end:
+                break
+        if cursor < end:
+            missing.append((cursor, end))
+        return missing
+
+    def store(self, source, station, start, end, records):
+        """
+        Replace the cached records of [start, end) and mark the span as covered.
+
+        Parameters
+        ----------
+        source, station : str
+            Cache key.
+        start, end : str or datetime-like
+            Half-open span the records were fetched for.
+        records : iterable of (str, float or None)
+            (time key as returned by the service, value) pairs.
+        """
+        start, end = _iso(_timestamp(start)), _iso(_timestamp(end))
+        records = [(key, value) for key, value in records if key]
+        times = pd.to_datetime([key for key, _ in records], utc=True).tz_localize(None).strftime(_TIME_FORMAT)
+        rows = [(source, station, t, key, None if value is None else float(value))
+                for t, (key, value) in zip(times, records)]
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM records WHERE source = ? AND station = ? AND time >= ? AND time < ?',
+                (source, station, start, end))
+            self._conn.executemany('INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?)', rows)
+            # spans inside the new one are superseded by it
+            self._conn.execute(
+                'DELETE FROM coverage WHERE source = ? AND station = ? AND start >= ? AND end <= ?',
+                (source, station, start, end))
+            self._conn.execute('INSERT INTO coverage VALUES (?, ?, ?, ?, ?)',
+                               (source, station, start, end, time.time()))
+
+    def load(self, source, station, start, end):
+        """Return the cached (key, value) records of [start, end) in time order."""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT key, value FROM records '
+                'WHERE source = ? AND station = ? AND time >= ? AND time < ? ORDER BY time',
+                (source, station, _iso(_timestamp(start)), _iso(_timestamp(end)))
+            ).fetchall()
+
+    def get_meta(self, source, station, any_age=False):
+        """Return cached station metadata, or None if missing or (unless ``any_age``) expired."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT meta, fetched FROM metadata WHERE source = ? AND station = ?',
+                (source, station)
+            ).fetchone()
+        if row is None or not (any_age or self.offline or time.time() - row[1] < self.ttl_hours * 3600):
+            return None
+        return json.loads(row[0])
+
+    def put_meta(self, source, station, meta):
+        """Store JSON-serializable station metadata."""
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?)',
+                               (source, station, json.dumps(meta), time.time()))
+
+    def close(self):
+        """Close the database connection."""
+        self._conn.close()
+
+    def _is_fresh(self, span_end, fetched, provisional):
+        """Whether a cached span fetched at ``fetched`` (epoch seconds) can still be used."""
+        if time.time() - fetched < self.ttl_hours * 3600:
+            return True
+        final_before = pd.Timestamp.now('UTC').tz_localize(None) - pd.Timedelta(days=self.provisional_days)
+        return not provisional and span_end <= final_before
+
+def _timestamp(value):
+    """Convert a date/datetime string or object to a naive UTC pd.Timestamp."""
+    ts = pd.Timestamp(value)
+    return ts.tz_convert('UTC').tz_localize(None) if ts.tzinfo is not None else ts
+
+def _iso(ts):
+    return ts.strftime(_TIME_FORMAT)
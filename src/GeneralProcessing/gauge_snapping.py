@@ -0,0 +1,241 @@
+"""
+Gauge Snapping
+===============================================
+gauge_snapping.py matches streamflow gauges to the subbasins of a drainage
+database (DDB) or to MERIT-Hydro river segments.
+
+All gauges are matched in one vectorized pass: the target points (DDB subbasin
+`lon`/`lat`, or vertices of the river segments) are put in a KD-tree on 3D
+Earth-centred coordinates, the `k` nearest candidates of every gauge within
+`max_distance_km` are retrieved, and each candidate is scored by its distance
+and by the agreement between the gauge and target drainage areas. The best
+scoring candidate is the match.
+
+Drainage areas are compared in km². ``snap_gauges`` expects km² (convert USGS
+metadata from square miles first, e.g. with
+``StationCatalogue.from_station_info(meta_us, 'US')``);
+``GenStreamflowFile.snap_site_details`` converts USGS entries itself.
+
+Example Usage
+-------------
+>>> from GeneralProcessing.gauge_snapping import ddb_snap_targets, snap_gauges
+>>> targets = ddb_snap_targets("MESH_drainage_database.nc")
+>>> matches = snap_gauges(meta_ca, targets, max_distance_km=5.0)
+>>> site_details = gen_flow.snap_site_details(meta_ca, targets)
+>>> gen_flow.write_flow_data_to_file_obstxt("MESH_input_streamflow.txt", df_ca, site_details,
+...                                         subbasin_file="MESH_input_streamflow_subbasins.csv")
+"""
+
+import numpy as np
+import pandas as pd
+import xarray as xs
+import geopandas as gpd
+import shapely
+from scipy.spatial import cKDTree
+
+# Mean Earth radius (km)
+EARTH_RADIUS_KM = 6371.0088
+
+# Subbasin ID of gauges without an acceptable match
+NO_MATCH = -1
+
+def ddb_snap_targets(input_ddb, area_var='DA'):
+    """
+    Read the snapping targets of a drainage database.
+
+    Parameters
+    ----------
+    input_ddb : str
+        Path to the NetCDF drainage database with 'subbasin', 'lon' and 'lat'.
+    area_var : str or None
+        Drainage area variable (default 'DA'). Areas in m² (per its 'units'
+        attribute) are converted to km². If missing, targets have no area
+        and gauges are matched on distance only.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per subbasin with columns 'Subbasin', 'Longitude', 'Latitude'
+        and 'Drainage_Area' (km²).
+    """
+    db = xs.open_dataset(input_ddb)
+    try:
+        targets = pd.DataFrame({
+            'Subbasin':  db.variables['subbasin'].values,
+            'Longitude': db.variables['lon'].values.astype(float),
+            'Latitude':  db.variables['lat'].values.astype(float),
+        })
+        if area_var and area_var in db.variables:
+            area = db.variables[area_var].values.astype(float)
+            units = str(db.variables[area_var].attrs.get('units', 'm**2')).replace(' ', '').lower()
+            if not units.startswith('km'):
+                area = area / 1e6
+            targets['Drainage_Area'] = area
+        else:
+            targets['Drainage_Area'] = np.nan
+    finally:
+        db.close()
+    return targets
+
+def river_snap_targets(river, id_column='COMID', area_column='uparea', spacing=0.005):
+    """
+    Build snapping targets from river segments (e.g. MERIT-Hydro rivers).
+
+    Segments are densified so that consecutive vertices are at most
+    ``spacing`` degrees apart, and every vertex becomes a target point of
+    its segment.
+
+    Parameters
+    ----------
+    river : str or geopandas.GeoDataFrame
+        River network shapefile or layer (reprojected to EPSG:4326).
+    id_column : str
+        Segment ID column (default 'COMID').
+    area_column : str or None
+        Upstream drainage area column in km² (default 'uparea').
+    spacing : float
+        Maximum vertex spacing in degrees.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per vertex with columns 'Subbasin', 'Longitude', 'Latitude'
+        and 'Drainage_Area' (km²).
+    """
+    if isinstance(river, str):
+        river = gpd.read_file(river)
+    if river.crs is not None:
+        river = river.to_crs(epsg=4326)
+    geoms = shapely.segmentize(np.asarray(river.geometry.values), spacing)
+    coords, index = shapely.get_coordinates(geoms, return_index=True)
+    area = river[area_column].to_numpy(dtype=float) if area_column else np.full(len(river), np.nan)
+    return pd.DataFrame({
+        'Subbasin':      river[id_column].to_numpy()[index],
+        'Longitude':     coords[:, 0],
+        'Latitude':      coords[:, 1],
+        'Drainage_Area': area[index],
+    })
+
+def snap_gauges(gauges, targets, max_distance_km=5.0, area_tolerance=0.5, area_weight=1.0, k=16):
+    """
+    Match gauges to the best scoring target within ``max_distance_km``.
+
+    The score of a candidate is ``distance / max_distance_km +
+    area_weight * |ln(A_target / A_gauge)| / ln(1 + area_tolerance)``.
+    Candidates whose drainage area differs by more than a factor
+    ``1 + area_tolerance`` are rejected; when either area is unknown the
+    candidate is scored on distance only.
+
+    Parameters
+    ----------
+    gauges : list of dict, pd.DataFrame or StationCatalogue
+        Gauges with 'Station_Number', 'Latitude', 'Longitude' and optionally
+        'Drainage_Area' (km²).
+    targets : pd.DataFrame
+        Output of ``ddb_snap_targets`` or ``river_snap_targets``.
+    max_distance_km : float
+        Search radius.
+    area_tolerance : float
+        Accepted relative drainage-area mismatch.
+    area_weight : float
+        Weight of the area term of the score (0 = nearest target).
+    k : int
+        Number of nearest target points considered per gauge. With river
+        segments several points belong to one segment, so use a larger value
+        for densely densified networks.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per gauge, in input order, with 'Station_Number', 'Subbasin'
+        (``NO_MATCH`` if none), 'Distance_km', 'Subbasin_Drainage_Area',
+        'Area_Ratio', 'Score', 'Snapped_Latitude' and 'Snapped_Longitude'.
+
+    Example
+    -------
+    >>> matches = snap_gauges(catalogue, river_snap_targets("rivers.shp"), max_distance_km=2)
+    """
+    gauges = _gauge_frame(gauges)
+    targets = targets[targets['Longitude'].notna() & targets['Latitude'].notna()]
+    g_lon = pd.to_numeric(gauges['Longitude'], errors='coerce').to_numpy(dtype=float)
+    g_lat = pd.to_numeric(gauges['Latitude'], errors='coerce').to_numpy(dtype=float)
+    if 'Drainage_Area' in gauges.columns:
+        g_area = pd.to_numeric(gauges['Drainage_Area'], errors='coerce').to_numpy(dtype=float)
+    else:
+        g_area = np.full(len(gauges), np.nan)
+    t_ids = targets['Subbasin'].to_numpy()
+    t_lon = targets['Longitude'].to_numpy(dtype=float)
+    t_lat = targets['Latitude'].to_numpy(dtype=float)
+    t_area = targets['Drainage_Area'].to_numpy(dtype=float)
+
+    result = pd.DataFrame({
+        'Station_Number':         gauges['Station_Number'].to_numpy(),
+        'Subbasin':               NO_MATCH,
+        'Distance_km':            np.nan,
+        'Subbasin_Drainage_Area': np.nan,
+        'Area_Ratio':             np.nan,
+        'Score':                  np.nan,
+        'Snapped_Latitude':       np.nan,
+        'Snapped_Longitude':      np.nan,
+    })
+    located = np.flatnonzero(~(np.isnan(g_lon) | np.isnan(g_lat)))
+    if len(located) == 0 or len(targets) == 0:
+        return result
+
+    # k nearest target points of every gauge (chord distances on the sphere)
+    tree = cKDTree(_unit_vectors(t_lon, t_lat) * EARTH_RADIUS_KM)
+    max_chord = 2 * EARTH_RADIUS_KM * np.sin(max_distance_km / (2 * EARTH_RADIUS_KM))
+    k = min(k, len(targets))
+    chord, point = tree.query(_unit_vectors(g_lon[located], g_lat[located]) * EARTH_RADIUS_KM,
+                              k=k, distance_upper_bound=max_chord)
+    chord, point = chord.reshape(len(located), k), point.reshape(len(located), k)
+
+    # one row per (gauge, candidate point) within the search radius
+    g_pos, slot = np.nonzero(np.isfinite(chord))
+    point = point[g_pos, slot]
+    gauge_row = located[g_pos]
+    distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord[g_pos, slot] / (2 * EARTH_RADIUS_KM), 1.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = t_area[point] / g_area[gauge_row]
+        area_error = np.abs(np.log(ratio))
+    area_error[~np.isfinite(area_error)] = np.nan
+    area_limit = np.log1p(area_tolerance)
+    keep = np.isnan(area_error) | (area_error <= area_limit)
+    score = distance / max_distance_km + area_weight * np.nan_to_num(area_error) / area_limit
+
+    candidates = pd.DataFrame({
+        'row': gauge_row, 'point': point, 'distance': distance,
+        'ratio': ratio, 'score': score
+    })[keep]
+    if candidates.empty:
+        return result
+    # best candidate per gauge (ties go to the nearer point)
+    best = candidates.sort_values(['row', 'score', 'distance'], kind='stable').drop_duplicates('row')
+    rows, pts = best['row'].to_numpy(), best['point'].to_numpy()
+    result.loc[rows, 'Subbasin'] = t_ids[pts]
+    result.loc[rows, 'Distance_km'] = best['distance'].to_numpy()
+    result.loc[rows, 'Subbasin_Drainage_Area'] = t_area[pts]
+    result.loc[rows, 'Area_Ratio'] = best['ratio'].to_numpy()
+    result.loc[rows, 'Score'] = best['score'].to_numpy()
+    result.loc[rows, 'Snapped_Latitude'] = t_lat[pts]
+    result.loc[rows, 'Snapped_Longitude'] = t_lon[pts]
+    return result
+
+def _gauge_frame(gauges):
+    """Return gauges given as a StationCatalogue, DataFrame or list of dicts as a DataFrame."""
+    if hasattr(gauges, 'frame'):
+        gauges = gauges.frame
+    frame = pd.DataFrame(gauges).reset_index(drop=True)
+    for col in ('Station_Number', 'Latitude', 'Longitude'):
+        if col not in frame.columns:
+            raise ValueError(f"Gauges have no '{col}' column")
+    if 'Station_Name' in frame.columns:
+        # placeholder entries of unknown stations carry -1 coordinates
+        unknown = frame['Station_Name'].eq('Unknown').fillna(False).to_numpy(dtype=bool)
+        frame.loc[unknown, ['Latitude', 'Longitude']] = np.nan
+    return frame
+
+def _unit_vectors(lon, lat):
+    """3D unit vectors of lon/lat points in degrees."""
+    lon, lat = np.radians(lon), np.radians(lat)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
@@ -2,6 +2,9 @@
 Streamflow File Preparation
 ===============================================
 gen_streamflow_file.py contains a class GenStreamflowFile that handles fetching and combining streamflow data from USGS and Environment Canada and generating output in the OBSTXT and ENSIM formats.
+All web requests go through a shared FetchEngine (fetch_engine.py), so stations are fetched concurrently over pooled
+connections with per-host rate limiting and retries. With a FlowCache (flow_cache.py) records and station metadata are
+kept on disk and only missing or expired date spans are downloaded.
 
 Parameters:
 ------------
@@ -9,6 +12,8 @@ Parameters:
 `extract_flow_data_us`: Fetches flow data from US stations.
 `write_flow_data_to_file_obstxt`: Writes the data in OBSTXT format.
 `write_flow_data_to_file_ensim`: Writes the data in ENSIM format.
+`fetch_station_catalogue`: Bulk-loads station metadata into a StationCatalogue (station_catalogue.py).
+`snap_site_details`: Matches stations to DDB subbasins or river segments (gauge_snapping.py).
 
 Example Usage (Please check MESH_streamflowFile_example.ipynb for step by step example)
 -----------------------------------------------------------------------------------------
@@ -49,53 +54,96 @@ import requests
 from owslib.ogcapi.features import Features
 from datetime import datetime, timedelta, timezone
 import time
+from GeneralProcessing.fetch_engine import FetchEngine
+from GeneralProcessing.flow_cache import FlowCache
+from GeneralProcessing.station_catalogue import StationCatalogue, SQ_MILES_TO_KM2
+from GeneralProcessing.gauge_snapping import snap_gauges, NO_MATCH
+
+# Base URLs of the web services (override them to test against a local server)
+USGS_URL = "https://waterservices.usgs.gov/nwis"
+GEOMET_URL = "https://api.weather.gc.ca"
+
+# Maximum number of sites per USGS multi-site request
+USGS_BATCH_SIZE = 100
 
 class GenStreamflowFile:
-    def __init__(self):
-        self.oafeat = Features("https://api.weather.gc.ca/")
+    def __init__(
+        self,
+        max_workers: int = 8,
+        retries: int = 4,
+        rate_limit: float = None,
+        session: requests.Session = None,
+        usgs_url: str = USGS_URL,
+        geomet_url: str = GEOMET_URL,
+        cache=None
+    ):
+        """
+        Parameters
+        ----------
+        max_workers : int
+            Number of stations fetched concurrently (1 = serial).
+        retries : int
+            Retries of a request on connection errors, HTTP 429 and 5xx.
+        rate_limit : float, optional
+            Maximum requests per second to each host.
+        session : requests.Session, optional
+            Session shared by all requests (default: a new pooled session).
+        usgs_url, geomet_url : str
+            Base URLs of the USGS water services and the MSC GeoMet API.
+        cache : str or FlowCache, optional
+            On-disk cache of downloaded records and metadata (a SQLite path or
+            a FlowCache, e.g. one created with ``offline=True``). None disables caching.
+        """
+        self.usgs_url = usgs_url.rstrip('/')
+        self.geomet_url = geomet_url.rstrip('/')
+        self.engine = FetchEngine(max_workers=max_workers, retries=retries,
+                                  rate_limit=rate_limit, session=session)
+        self._oafeat = None
+        self.cache = FlowCache(cache) if isinstance(cache, str) else cache
+
+    @property
+    def oafeat(self):
+        """OGC API Features client of GeoMet, created on first use (it requests the landing page)."""
+        if self._oafeat is None:
+            self._oafeat = Features(self.geomet_url + "/")
+        return self._oafeat
 
     def create_date_range(self, start_date, end_date):
         return pd.date_range(start=start_date, end=end_date)
 
-    def extract_flow_data_us(self, station_list, start_date, end_date):
+    def extract_flow_data_us(self, station_list, start_date, end_date, batch_size=USGS_BATCH_SIZE):
         dates = self.create_date_range(start_date, end_date)
         data_dict = {'Date': dates}
-        date_index_dict = {str(date.date()): idx for idx, date in enumerate(dates)}
         station_info = []
         print(len(station_list))
 
-        # Initialize the data dictionary with NaN values for each station
+        # Initialize the data dictionary with -1 (missing) for each station
         for station in station_list:
-            data_dict[station] = [-1] * len(dates)  # Fill with -1 by default
+            data_dict[station] = np.full(len(dates), -1.0)
+
+        # Fetch stations in multi-site batches and split the series by site
+        series_by_site, failed = self._fetch_usgs_dv(station_list, start_date, end_date, batch_size)
 
         for station in station_list:
-            start_time_station = time.time()
-            url = f"https://waterservices.usgs.gov/nwis/dv/?format=json&sites={station}&startDT={start_date}&endDT={end_date}&parameterCd=00060&statCd=00003"
-            response = requests.get(url)
-            
-            if response.status_code == 200:
-                data = response.json()
-                # Check if 'timeSeries' is not empty
-                if 'value' in data and 'timeSeries' in data['value'] and data['value']['timeSeries']:
-                    time_series = data['value']['timeSeries'][0]
+            if station not in failed:
+                # Check if a time series was returned for the station
+                if station in series_by_site:
+                    time_series = series_by_site[station]
                     variable_info = time_series['variable']
                     unit = variable_info.get('unit', {}).get('unitCode', None)
                     parameter_units = variable_info.get('variableDescription', None)
 
                     records = time_series['values'][0]['value']
-                    flow_data = pd.DataFrame(records)
-                    flow_data['value'] = pd.to_numeric(flow_data['value'], errors='coerce')
+                    flow_data = pd.DataFrame(records, columns=['dateTime', 'value'])
+                    values = pd.to_numeric(flow_data['value'], errors='coerce').to_numpy(dtype=float)
 
                     # Convert flow data to cms if the unit is cfs
                     if unit == 'ft3/s' or parameter_units == 'Cubic Feet per Second':
-                        flow_data['value'] = flow_data['value'] * 0.0283168
-                    
-                    flow_data['dateTime'] = pd.to_datetime(flow_data['dateTime']).dt.date.astype(str)
+                        values = values * 0.0283168
 
-                    for date, flow in zip(flow_data['dateTime'], flow_data['value']):
-                        if date in date_index_dict:
-                            date_index = date_index_dict[date]
-                            data_dict[station][date_index] = flow
+                    data_dict[station] = self._align_to_dates(
+                        flow_data['dateTime'].str[:10], values, dates, fill=-1.0
+                    )
                     
                     site_info = time_series['sourceInfo']
                     station_info.append({
@@ -131,9 +179,6 @@ class GenStreamflowFile:
                     'Unit': None,
                     'Parameter_Units': None
                 })
-            
-            end_time_station = time.time()
-            print(f"Time taken to retrieve data for station {station}: {end_time_station - start_time_station} seconds")
 
         combined_df = pd.DataFrame(data_dict)
         return combined_df, station_info
@@ -143,11 +188,15 @@ class GenStreamflowFile:
         station_list: list[str],
         start_date: str,
         end_date: str,
-        limit: int = 1000
+        limit: int = 1000,
+        batch_size: int = USGS_BATCH_SIZE
     ) -> tuple[pd.DataFrame, list[dict]]:
         """
         Fetch daily‐mean discharge and full station metadata for USGS gauges.
 
+        Stations are requested from the DV and Site services in multi-site
+        batches, and the responses are split by site code.
+
         Parameters
         ----------
         station_list : list[str]
@@ -158,6 +207,8 @@ class GenStreamflowFile:
             End   date in 'YYYY-MM-DD' format.
         limit : int
             Page size for API requests (default=1000).
+        batch_size : int
+            Maximum number of sites per request (default=100).
 
         Returns
         -------
@@ -168,42 +219,23 @@ class GenStreamflowFile:
               Station_Number, Station_Name, Latitude, Longitude,
               Drainage_Area, Contrib_Drainage_Area, Elevation_m, Datum
         """
-        # ensure numpy is imported: import numpy as np
         # 1) build daily index
         dates = pd.date_range(start=start_date, end=end_date, freq='D')
-        df = pd.DataFrame({'Date': dates})
-        idx = {d.strftime('%Y-%m-%d'): i for i, d in enumerate(dates)}
-        for st in station_list:
-            df[st] = np.nan
+        data = {'Date': dates}
 
         # 2) fetch daily‐mean via DV service
+        series_by_site, _ = self._fetch_usgs_dv(station_list, start_date, end_date, batch_size,
+                                                raise_errors=True)
+
         for st in station_list:
-            t0 = time.time()
-            r = requests.get(
-                "https://waterservices.usgs.gov/nwis/dv/",
-                params={
-                    'format':     'json',
-                    'sites':      st,
-                    'startDT':    start_date,
-                    'endDT':      end_date,
-                    'parameterCd':'00060',
-                    'statCd':     '00003'
-                }
-            )
-            r.raise_for_status()
-            series = r.json().get('value', {}).get('timeSeries', [])
-            if series:
-                for rec in series[0]['values'][0]['value']:
-                    date = rec['dateTime'][:10]
-                    try:
-                        val = float(rec['value'])
-                    except (TypeError, ValueError):
-                        val = np.nan
-                    if date in idx:
-                        df.iat[idx[date], df.columns.get_loc(st)] = val
-            print(f"Fetched DV for {st} in {time.time()-t0:.1f}s")
-
-        df.set_index('Date', inplace=True)
+            if st in series_by_site:
+                recs = pd.DataFrame(series_by_site[st]['values'][0]['value'], columns=['dateTime', 'value'])
+                values = pd.to_numeric(recs['value'], errors='coerce').to_numpy(dtype=float)
+                data[st] = self._align_to_dates(recs['dateTime'].str[:10], values, dates)
+            else:
+                data[st] = np.full(len(dates), np.nan)
+
+        df = pd.DataFrame(data).set_index('Date')
 
         # 3) fetch expanded site metadata via RDB Site service
         station_info = []
@@ -211,27 +243,32 @@ class GenStreamflowFile:
             try: return float(x)
             except: return np.nan
 
+        site_rows = {}
+        to_fetch = []
         for st in station_list:
-            t0 = time.time()
-            r = requests.get(
-                "https://waterservices.usgs.gov/nwis/site",
-                params={
-                    'format':     'rdb',
-                    'sites':      st,
-                    'siteOutput': 'expanded',
-                    'siteStatus': 'all'
-                }
-            )
+            cached = self.cache.get_meta('usgs-site', st) if self.cache is not None else None
+            if cached is not None:
+                site_rows[st] = cached
+            elif self.cache is None or not self.cache.offline:
+                to_fetch.append(st)
+        for sites, r in self._fetch_usgs_batches(
+            'site', to_fetch,
+            {
+                'format':     'rdb',
+                'siteOutput': 'expanded',
+                'siteStatus': 'all'
+            },
+            batch_size
+        ):
             r.raise_for_status()
-            # strip comments, skip types row, read data row
-            lines = [L for L in r.text.splitlines() if not L.startswith('#') and L.strip()]
-            if len(lines) >= 3:
-                header = lines[0].split('\t')
-                values = lines[2].split('\t')
-                meta   = dict(zip(header, values))
-            else:
-                meta = {}
+            rows = self._parse_rdb(r.text)
+            site_rows.update(rows)
+            if self.cache is not None:
+                for st in sites:
+                    self.cache.put_meta('usgs-site', st, rows.get(st, {}))
 
+        for st in station_list:
+            meta = site_rows.get(st, {})
             station_info.append({
                 'Station_Number':        meta.get('site_no', st),
                 'Station_Name':          meta.get('station_nm'),
@@ -242,10 +279,122 @@ class GenStreamflowFile:
                 'Elevation_m':           to_float(meta.get('alt_va')),
                 'Datum':                 meta.get('vertical_datum')
             })
-            print(f"Fetched metadata for {st} in {time.time()-t0:.1f}s")
 
         return df, station_info
-    
+
+    def _fetch_usgs_dv(self, station_list, start_date, end_date, batch_size=USGS_BATCH_SIZE,
+                       raise_errors=False):
+        """
+        Fetch USGS daily-mean discharge series of many stations in multi-site batches.
+
+        With a cache, each station only requests its missing date spans;
+        stations missing the same spans are batched together, and the series
+        returned are rebuilt from the cache for the full period.
+
+        Returns
+        -------
+        series_by_site : dict
+            Site code → DV JSON time series of the requested period.
+        failed : set
+            Stations whose request failed (only when ``raise_errors`` is False).
+        """
+        params = {'format': 'json', 'parameterCd': '00060', 'statCd': '00003'}
+        series_by_site = {}
+        failed = set()
+
+        if self.cache is None:
+            for sites, r in self._fetch_usgs_batches(
+                'dv/', station_list, {**params, 'startDT': start_date, 'endDT': end_date}, batch_size
+            ):
+                if r.status_code == 200:
+                    series_by_site.update(self._series_by_site(r.json()))
+                elif raise_errors:
+                    r.raise_for_status()
+                else:
+                    failed.update(sites)
+            return series_by_site, failed
+
+        # group stations by the date spans missing from the cache
+        source = 'usgs-dv-00060-00003'
+        start = pd.Timestamp(start_date)
+        end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+        by_span = {}
+        for st in station_list:
+            for span in self.cache.missing_spans(source, st, start, end):
+                by_span.setdefault(span, []).append(st)
+
+        for (a, b), stations in by_span.items():
+            span_params = {**params, 'startDT': f"{a:%Y-%m-%d}", 'endDT': f"{b - pd.Timedelta(days=1):%Y-%m-%d}"}
+            for sites, r in self._fetch_usgs_batches('dv/', stations, span_params, batch_size):
+                if r.status_code != 200:
+                    if raise_errors:
+                        r.raise_for_status()
+                    failed.update(sites)
+                    continue
+                fetched = self._series_by_site(r.json())
+                for st in sites:
+                    series = fetched.get(st)
+                    values = series['values'][0]['value'] if series else []
+                    self.cache.store(source, st, a, b,
+                                     [(v['dateTime'], pd.to_numeric(v['value'], errors='coerce')) for v in values])
+                    if series:
+                        self.cache.put_meta(source, st, {'variable': series['variable'],
+                                                         'sourceInfo': series['sourceInfo']})
+
+        for st in station_list:
+            if st in failed:
+                continue
+            info = self.cache.get_meta(source, st, any_age=True)
+            records = self.cache.load(source, st, start, end)
+            if info is not None and records:
+                series_by_site[st] = {**info, 'values': [{'value': [
+                    {'dateTime': key, 'value': value} for key, value in records
+                ]}]}
+        return series_by_site, failed
+
+    def _fetch_usgs_batches(self, path, station_list, params, batch_size=USGS_BATCH_SIZE):
+        """
+        GET a USGS service for groups of up to ``batch_size`` comma-separated sites.
+
+        Batches are fetched concurrently. A batch rejected with a 4xx status
+        (e.g. because one site number is invalid) is split in half and
+        re-requested, so a bad site only fails its own single-site request.
+
+        Returns a list of (sites, response) pairs covering every station once.
+        """
+        def fetch(sites):
+            t0 = time.time()
+            r = self.engine.get(f"{self.usgs_url}/{path}", params={**params, 'sites': ','.join(sites)})
+            print(f"Fetched {path.strip('/')} for {len(sites)} site(s) in {time.time()-t0:.1f}s")
+            if 400 <= r.status_code < 500 and len(sites) > 1:
+                half = len(sites) // 2
+                return fetch(sites[:half]) + fetch(sites[half:])
+            return [(sites, r)]
+
+        station_list = list(station_list)
+        batches = [station_list[i:i + batch_size] for i in range(0, len(station_list), batch_size)]
+        return [pair for pairs in self.engine.map(fetch, batches) for pair in pairs]
+
+    @staticmethod
+    def _series_by_site(data):
+        """Map site code → first time series of a USGS DV JSON response."""
+        by_site = {}
+        for series in data.get('value', {}).get('timeSeries', []):
+            by_site.setdefault(series['sourceInfo']['siteCode'][0]['value'], series)
+        return by_site
+
+    @staticmethod
+    def _parse_rdb(text):
+        """Map site_no → row dict of a USGS RDB table (comments and the types row skipped)."""
+        lines = [L for L in text.splitlines() if not L.startswith('#') and L.strip()]
+        rows = {}
+        if len(lines) >= 3:
+            header = lines[0].split('\t')
+            for line in lines[2:]:
+                row = dict(zip(header, line.split('\t')))
+                rows.setdefault(row.get('site_no'), row)
+        return rows
+
     def fetch_hydrometric_data_ca(
         self,
         station_numbers: list[str],
@@ -277,58 +426,66 @@ class GenStreamflowFile:
               DRAINAGE_AREA_GROSS, DRAINAGE_AREA_EFFECT, REAL_TIME, RHBN,
               STATUS_EN, VERTICAL_DATUM, Latitude, Longitude
         """
-        # 1) build empty daily‐indexed DataFrame
+        # 1) build daily index
         dates = pd.date_range(start=start_date, end=end_date, freq='D')
         data = {'Date': dates}
-        idx_map = {dt.strftime('%Y-%m-%d'): i for i, dt in enumerate(dates)}
-        for st in station_numbers:
-            data[st] = [None] * len(dates)
-        df = pd.DataFrame(data)
 
         # 2) fetch daily‐mean discharge
-        for st in station_numbers:
+        def fetch_span(st, a, b):
             offset = 0
-            feats_all = []
-            t0 = time.time()
+            records = []
             while True:
-                url = "https://api.weather.gc.ca/collections/hydrometric-daily-mean/items"
+                url = f"{self.geomet_url}/collections/hydrometric-daily-mean/items"
                 params = {
                     'STATION_NUMBER': st,
-                    'datetime':       f"{start_date}/{end_date}",
+                    'datetime':       f"{a:%Y-%m-%d}/{b - pd.Timedelta(days=1):%Y-%m-%d}",
                     'limit':          limit,
                     'offset':         offset,
                     'f':              'json'
                 }
-                r = requests.get(url, params=params)
+                r = self.engine.get(url, params=params)
                 r.raise_for_status()
                 feats = r.json().get('features', [])
                 if not feats:
                     break
-                feats_all.extend(feats)
+                records.extend((f['properties']['DATE'], f['properties'].get('DISCHARGE')) for f in feats)
                 offset += limit
                 if len(feats) < limit:
                     break
+            return records
 
-            for feat in feats_all:
-                p = feat['properties']
-                date_str = p['DATE']
-                disc = p.get('DISCHARGE')
-                if disc is None:
-                    continue
-                key = datetime.strptime(date_str, "%Y-%m-%d").strftime("%Y-%m-%d")
-                if key in idx_map:
-                    df.at[idx_map[key], st] = float(disc)
+        def fetch_daily(st):
+            t0 = time.time()
+            records = self._cached_records(
+                'ca-daily-mean-discharge', st,
+                pd.Timestamp(start_date), pd.Timestamp(end_date) + pd.Timedelta(days=1),
+                lambda a, b: fetch_span(st, a, b)
+            )
             print(f"Fetched daily‐mean for {st} in {time.time()-t0:.1f}s")
+            return records
+
+        for st, records in zip(station_numbers, self.engine.map(fetch_daily, station_numbers)):
+            recs = pd.DataFrame(records, columns=['DATE', 'DISCHARGE']).dropna(subset=['DISCHARGE'])
+            data[st] = self._align_to_dates(recs['DATE'], recs['DISCHARGE'].to_numpy(dtype=float), dates)
+        df = pd.DataFrame(data)
 
         # 3) fetch full station metadata
-        metadata = []
-        for st in station_numbers:
+        def fetch_station(st):
             t0 = time.time()
-            url = "https://api.weather.gc.ca/collections/hydrometric-stations/items"
+            url = f"{self.geomet_url}/collections/hydrometric-stations/items"
             params = {'STATION_NUMBER': st, 'f': 'json', 'limit': 1}
-            r = requests.get(url, params=params)
-            r.raise_for_status()
-            feats = r.json().get('features', [])
+
+            def fetch():
+                r = self.engine.get(url, params=params)
+                r.raise_for_status()
+                return r.json().get('features', [])
+
+            feats = self._cached_meta('ca-station', st, fetch)
+            print(f"Fetched metadata for {st} in {time.time()-t0:.1f}s")
+            return feats
+
+        metadata = []
+        for st, feats in zip(station_numbers, self.engine.map(fetch_station, station_numbers)):
             if feats:
                 p = feats[0]['properties']
                 lon, lat = feats[0]['geometry']['coordinates']
@@ -348,7 +505,6 @@ class GenStreamflowFile:
                 })
             else:
                 metadata.append({'Station_Number': st})
-            print(f"Fetched metadata for {st} in {time.time()-t0:.1f}s")
 
         return df.set_index('Date'), metadata
 
@@ -359,67 +515,143 @@ class GenStreamflowFile:
         end: str,
         window_days: int = 1,
         freq_hours: int = 1,
-        limit: int = 1000
+        limit: int = 1000,
+        raise_errors: bool = False
     ):
         """
         Fetches hourly provisional (real-time) discharge by slicing [start,end] into
         `window_days`-day windows and resampling to `freq_hours`.
+
+        All station × window requests run concurrently through the fetch engine,
+        each following `offset` pagination until its window is complete. The
+        records are collected in one long table that is pivoted and resampled
+        once; the output covers, as before, the resampled span of each station.
+        All stations share one bin grid starting at midnight of the first day
+        with data (identical to per-station resampling when `freq_hours`
+        divides 24).
+
+        A failed station window (HTTP error, connection error) does not abort
+        the fetch: the stations with failed windows are reported and returned
+        with the data of their other windows. With `raise_errors=True` the
+        first failure is raised instead.
         """
-        base_url = "https://api.weather.gc.ca/collections/hydrometric-realtime/items"
+        base_url = f"{self.geomet_url}/collections/hydrometric-realtime/items"
         headers = {"Accept": "application/geo+json"}
         iso_fmt = "%Y-%m-%dT%H:%M:%SZ"
 
         start_dt = datetime.strptime(start, iso_fmt).replace(tzinfo=timezone.utc)
         end_dt   = datetime.strptime(end,   iso_fmt).replace(tzinfo=timezone.utc)
 
-        records = {st: [] for st in station_numbers}
-        meta    = {}
-
+        # one task per (window, station), in window order; windows are half-open
+        # [win, win_end) spans (as cached), the last one ending just after `end`
+        # so the record at `end` is included
+        one_second = timedelta(seconds=1)
+        tasks = []
         win = start_dt
         while win < end_dt:
             win_end = min(win + timedelta(days=window_days), end_dt)
-            t0 = time.time()
-            for st in station_numbers:
-                params = {
-                    "STATION_NUMBER": st,
-                    "datetime":       f"{win.strftime(iso_fmt)}/{win_end.strftime(iso_fmt)}",
-                    "limit":          limit,
-                    "offset":         0,
-                    "f":              "json"
-                }
-                resp = requests.get(base_url, headers=headers, params=params)
-                feats = resp.json().get("features", [])
-                for f in feats:
-                    p = f["properties"]
-                    dt = p.get("DATETIME")
-                    q  = p.get("DISCHARGE")
-                    if dt and q is not None:
-                        ts = datetime.strptime(dt, iso_fmt).replace(tzinfo=timezone.utc)
-                        records[st].append((ts, q))
-                if st not in meta and feats:
-                    p0   = feats[0]["properties"]
-                    geom = feats[0]["geometry"]
-                    meta[st] = {
-                        "Station_Number": p0["STATION_NUMBER"],
-                        "Station_Name":   p0["STATION_NAME"],
-                        "Latitude":       geom["coordinates"][1],
-                        "Longitude":      geom["coordinates"][0],
-                        "Drainage_Area":  p0.get("DRAINAGE_AREA_GROSS")
-                    }
-            print(f"Window {win.date()}–{win_end.date()} in {time.time()-t0:.1f}s")
+            tasks.extend((st, win, win_end + one_second if win_end == end_dt else win_end)
+                         for st in station_numbers)
             win = win_end
 
-        # assemble
-        df_all = pd.DataFrame()
-        for st, recs in records.items():
-            if not recs:
-                continue
-            df = (pd.DataFrame(recs, columns=["DateTime", st])
-                    .drop_duplicates("DateTime")
-                    .set_index("DateTime")
-                    .resample(f"{freq_hours}H")
-                    .mean())
-            df_all = df if df_all.empty else df_all.join(df, how="outer")
+        def fetch_window(task):
+            st, win, win_end = task
+            found = {}
+
+            def fetch(a, b):
+                # the datetime interval of the service includes its end
+                offset = 0
+                records = []
+                while True:
+                    params = {
+                        "STATION_NUMBER": st,
+                        "datetime":       f"{a.strftime(iso_fmt)}/{(b - one_second).strftime(iso_fmt)}",
+                        "limit":          limit,
+                        "offset":         offset,
+                        "f":              "json"
+                    }
+                    resp = self.engine.get(base_url, headers=headers, params=params)
+                    resp.raise_for_status()
+                    feats = resp.json().get("features", [])
+                    if feats and 'meta' not in found:
+                        p0   = feats[0]["properties"]
+                        geom = feats[0]["geometry"]
+                        found['meta'] = {
+                            "Station_Number": p0["STATION_NUMBER"],
+                            "Station_Name":   p0["STATION_NAME"],
+                            "Latitude":       geom["coordinates"][1],
+                            "Longitude":      geom["coordinates"][0],
+                            "Drainage_Area":  p0.get("DRAINAGE_AREA_GROSS")
+                        }
+                        if self.cache is not None:
+                            self.cache.put_meta('ca-realtime', st, found['meta'])
+                    records.extend((f["properties"].get("DATETIME"), f["properties"].get("DISCHARGE"))
+                                   for f in feats)
+                    offset += limit
+                    if len(feats) < limit:
+                        break
+                return records
+
+            try:
+                recs = self._cached_records('ca-realtime-discharge', st, win, win_end, fetch, provisional=True)
+            except requests.RequestException as e:
+                if raise_errors:
+                    raise
+                return None, found.get('meta'), e
+            if 'meta' not in found and recs and self.cache is not None:
+                found['meta'] = self.cache.get_meta('ca-realtime', st, any_age=True)
+            return recs, found.get('meta'), None
+
+        t0 = time.time()
+        results = self.engine.map(fetch_window, tasks)
+        print(f"Fetched {len(tasks)} station windows in {time.time()-t0:.1f}s")
+
+        # collect all records into one long table
+        meta = {}
+        parts = []
+        failed = {}
+        for (st, win, _), (recs, st_meta, error) in zip(tasks, results):
+            if error is not None:
+                failed.setdefault(st, []).append((win, error))
+            if recs:
+                part = pd.DataFrame(recs, columns=["DateTime", "Discharge"])
+                part["Station"] = st
+                parts.append(part)
+            if st not in meta and st_meta:
+                meta[st] = st_meta
+        for st, errors in failed.items():
+            win, error = errors[0]
+            print(f"Failed to retrieve real-time data for station {st} in {len(errors)} window(s), "
+                  f"first from {win.strftime(iso_fmt)}: {error}")
+        if failed:
+            print(f"Real-time data incomplete for {len(failed)} station(s): {', '.join(failed)}")
+
+        if parts:
+            long_df = pd.concat(parts, ignore_index=True).dropna(subset=["DateTime", "Discharge"])
+        else:
+            long_df = pd.DataFrame(columns=["DateTime", "Discharge", "Station"])
+
+        if long_df.empty:
+            df_all = pd.DataFrame()
+        else:
+            long_df["DateTime"] = pd.to_datetime(long_df["DateTime"], format=iso_fmt, utc=True)
+            long_df["Discharge"] = long_df["Discharge"].astype(float)
+            long_df = long_df.drop_duplicates(["Station", "DateTime"])
+            freq = f"{freq_hours}h"
+
+            # pivot and resample once, then keep the bins within each station's span
+            df_all = (long_df.pivot(index="DateTime", columns="Station", values="Discharge")
+                             .resample(freq)
+                             .mean())
+            stations = [st for st in station_numbers if st in df_all.columns]
+            df_all = df_all[list(dict.fromkeys(stations))]
+            span = long_df.groupby("Station")["DateTime"].agg(["min", "max"])
+            origin, step = df_all.index[0], pd.Timedelta(freq)
+            first = (origin + (span["min"] - origin) // step * step).to_numpy()[:, None]
+            last = (origin + (span["max"] - origin) // step * step).to_numpy()[:, None]
+            bins = df_all.index.to_numpy()[None, :]
+            df_all = df_all[((bins >= first) & (bins <= last)).any(axis=0)]
+            df_all.columns.name = None
 
         df_all.index.name = "DateTime"
         meta_list = list(meta.values())
@@ -433,12 +665,172 @@ class GenStreamflowFile:
                     "Drainage_Area":  None
                 })
         return df_all, meta_list
-       
+
+    def fetch_station_catalogue(self, limit: int = 1000, **filters):
+        """
+        Bulk-load the GeoMet hydrometric-stations collection into a StationCatalogue.
+
+        The first page reports the number of matching stations; the remaining
+        `offset` pages are then fetched concurrently. With a cache the
+        collection is kept as metadata and refreshed after its TTL.
+
+        Parameters
+        ----------
+        limit : int
+            Stations per page.
+        **filters
+            Extra queryable properties of the collection (e.g. PROV_TERR_STATE_LOC="AB").
+
+        Returns
+        -------
+        StationCatalogue
+
+        Example
+        -------
+        >>> catalogue = gen_flow.fetch_station_catalogue(PROV_TERR_STATE_LOC="AB")
+        >>> gauges = catalogue.within("basin.shp", active=True)
+        """
+        url = f"{self.geomet_url}/collections/hydrometric-stations/items"
+
+        def fetch_page(offset):
+            r = self.engine.get(url, params={**filters, 'f': 'json', 'limit': limit, 'offset': offset})
+            r.raise_for_status()
+            return r.json()
+
+        def fetch():
+            t0 = time.time()
+            first = fetch_page(0)
+            feats = first.get('features', [])
+            matched = first.get('numberMatched')
+            if matched is not None:
+                for page in self.engine.map(fetch_page, range(limit, matched, limit)):
+                    feats.extend(page.get('features', []))
+            elif len(feats) == limit:
+                # no count reported: follow pages until a short one
+                offset = limit
+                while True:
+                    page = fetch_page(offset).get('features', [])
+                    feats.extend(page)
+                    if len(page) < limit:
+                        break
+                    offset += limit
+            print(f"Fetched {len(feats)} stations in {time.time()-t0:.1f}s")
+            return feats
+
+        key = ','.join(f"{k}={v}" for k, v in sorted(filters.items())) or 'all'
+        feats = self._cached_meta('ca-station-catalogue', key, fetch) or []
+        return StationCatalogue.from_features(feats, source='CA')
+
+    def snap_site_details(self, site_details, targets, move_to_target=False, **snap_kwargs):
+        """
+        Match the stations of `site_details` to subbasins or river segments.
+
+        Parameters
+        ----------
+        site_details : list of dict
+            Station metadata as returned by the fetch methods. Drainage areas of
+            USGS stations (all-digit station numbers) are reported in square
+            miles and converted to km² for the comparison; others are in km².
+        targets : pd.DataFrame
+            Output of ``ddb_snap_targets`` or ``river_snap_targets`` (gauge_snapping.py).
+        move_to_target : bool
+            If True, replace the written Latitude/Longitude with those of the
+            matched target (the gauge coordinates are kept as
+            'Gauge_Latitude'/'Gauge_Longitude'), so the gauge falls on its subbasin.
+        **snap_kwargs
+            Passed to ``snap_gauges`` (max_distance_km, area_tolerance, ...).
+
+        Returns
+        -------
+        list of dict
+            Copies of `site_details` with 'Subbasin', 'Snap_Distance_km' and
+            'Area_Ratio' keys, for the writers' `subbasin_file` option.
+
+        Example
+        -------
+        >>> targets = ddb_snap_targets("MESH_drainage_database.nc")
+        >>> all_meta = gen_flow.snap_site_details(meta_ca + meta_rt, targets, max_distance_km=3)
+        """
+        gauges = []
+        for info in site_details:
+            area = info.get('Drainage_Area')
+            if area is not None and str(info.get('Station_Number', '')).isdigit():
+                # USGS site numbers are numeric and their areas are in square miles
+                area = pd.to_numeric(area, errors='coerce') * SQ_MILES_TO_KM2
+            gauges.append({**info, 'Drainage_Area': area})
+        matches = snap_gauges(gauges, targets, **snap_kwargs)
+        snapped = []
+        for info, m in zip(site_details, matches.to_dict('records')):
+            info = dict(info)
+            info['Subbasin'] = m['Subbasin']
+            info['Snap_Distance_km'] = m['Distance_km']
+            info['Area_Ratio'] = m['Area_Ratio']
+            if move_to_target and m['Subbasin'] != NO_MATCH:
+                info['Gauge_Latitude'], info['Gauge_Longitude'] = info['Latitude'], info['Longitude']
+                info['Latitude'], info['Longitude'] = m['Snapped_Latitude'], m['Snapped_Longitude']
+            snapped.append(info)
+        n_matched = int((matches['Subbasin'] != NO_MATCH).sum())
+        print(f"Snapped {n_matched} of {len(matches)} stations")
+        return snapped
+
+    @staticmethod
+    def _align_to_dates(date_keys, values, dates, fill=np.nan):
+        """
+        Align one station's daily records to a date index in a single reindex.
+
+        Parameters
+        ----------
+        date_keys : sequence of str
+            'YYYY-MM-DD' date of each record.
+        values : np.ndarray
+            Value of each record.
+        dates : pd.DatetimeIndex
+            Daily output index. Records outside it are dropped.
+        fill : float
+            Value of dates without a record.
+
+        Returns
+        -------
+        np.ndarray of float, aligned with ``dates``; for duplicated dates the
+        last record wins.
+        """
+        if len(values) == 0:
+            return np.full(len(dates), fill)
+        series = pd.Series(np.asarray(values, dtype=float),
+                           index=pd.to_datetime(pd.Index(date_keys), format='%Y-%m-%d'))
+        series = series[~series.index.duplicated(keep='last')]
+        return series.reindex(dates, fill_value=fill).to_numpy()
+
+    def _cached_records(self, source, station, start, end, fetch, provisional=False):
+        """
+        Return the (time key, value) records of ``station`` in [start, end), through the cache.
+
+        ``fetch(a, b)`` downloads the records of the span [a, b). Without a cache
+        it is called once for the whole span; with one, only for the spans
+        missing from the cache (none in offline mode).
+        """
+        if self.cache is None:
+            return fetch(start, end)
+        for a, b in self.cache.missing_spans(source, station, start, end, provisional):
+            self.cache.store(source, station, a, b, fetch(a, b))
+        return self.cache.load(source, station, start, end)
+
+    def _cached_meta(self, source, station, fetch):
+        """Return station metadata from the cache, calling ``fetch()`` when it is missing or expired."""
+        if self.cache is None:
+            return fetch()
+        meta = self.cache.get_meta(source, station)
+        if meta is None and not self.cache.offline:
+            meta = fetch()
+            self.cache.put_meta(source, station, meta)
+        return meta
+
     def write_flow_data_to_file_obstxt(
         self,
         file_path: str,
         flow_data: pd.DataFrame,
-        site_details: list
+        site_details: list,
+        subbasin_file: str = None
     ):
         """
         Write a pandas DataFrame of observed streamflow to a space-delimited text file.
@@ -453,6 +845,9 @@ class GenStreamflowFile:
         site_details : list of dict
             One dict per data column, each with keys:
             'Station_Number', 'Latitude', 'Longitude', 'Drainage_Area', 'Station_Name'.
+        subbasin_file : str, optional
+            Path of a CSV listing the matched subbasin of every data column
+            (site_details from ``snap_site_details``).
         """
     
         # 1) Replace NaNs with EnSim’s missing-value code
@@ -510,12 +905,12 @@ class GenStreamflowFile:
                 f"{start_year}  {start_day_of_year} 00\n"
             )
     
-            # 7) Station metadata block
+            # 7) Station metadata block (first site_details entry per station)
+            site_index = {}
+            for s in site_details:
+                site_index.setdefault(s["Station_Number"], s)
             for station_id in data_columns:
-                info = next(
-                    (s for s in site_details if s["Station_Number"] == station_id),
-                    None
-                )
+                info = site_index.get(station_id)
                 if not info:
                     continue  # skip if no matching site_details
                 lat = info['Latitude']
@@ -534,22 +929,15 @@ class GenStreamflowFile:
                     f"{name}\n"
                 )
     
-            # 8) Data lines: one row per time step, values only
-            for idx in range(num_days):
-                # extract the flow values in column order
-                row = flow_data.iloc[idx]
-                values = [row[c] for c in data_columns]
-                # format each value to width=12, 4 decimals
-                line = " ".join(f"{v:12.4f}" for v in values)
-                # same date grab/format/append
-                if date_cols:
-                    date_val = flow_data[date_cols[0]].iloc[idx]
-                else:
-                    date_val = flow_data.index[idx]
-                date_str = date_val.strftime("%Y/%m/%d")
-                
-                file_conn.write(f"{line}  {date_str}\n")
-                #file_conn.write(f"{line}\n")
+            # 8) Data lines: values (width=12, 4 decimals) then the date, formatted in bulk
+            if date_cols:
+                date_vals = flow_data[date_cols[0]]
+            else:
+                date_vals = flow_data.index
+            self._write_value_rows(file_conn, flow_data[data_columns], date_vals, "%12.4f")
+
+        if subbasin_file:
+            self._write_subbasin_file(subbasin_file, data_columns, site_index)
 
     def write_flow_data_to_file_ensim(
         self,
@@ -557,7 +945,8 @@ class GenStreamflowFile:
         flow_data: pd.DataFrame,
         site_details: list,
         column_width: int = 12,
-        initial_spacing: int = 28
+        initial_spacing: int = 28,
+        subbasin_file: str = None
     ):
         """
         Write a pandas DataFrame of streamflow time series to an EnSim‐formatted ASCII file.
@@ -575,6 +964,9 @@ class GenStreamflowFile:
             Fixed width for each numeric field.
         initial_spacing : int
             Number of spaces before the first data column on each line.
+        subbasin_file : str, optional
+            Path of a CSV listing the matched subbasin of every data column
+            (site_details from ``snap_site_details``).
         """
     
         # 1) Replace all NaNs with EnSim’s missing‐value code (-1.000)
@@ -681,21 +1073,73 @@ class GenStreamflowFile:
         with open(file_path, "w") as f:
             # 7a) Write the header block
             f.write("\n".join(header) + "\n")
-            # 7b) Write one line per time step
-            for _, row in flow_data.iterrows():
-                # Extract values for each data column in order
-                values = [row[col] for col in data_columns]
-                # Format each value to fixed width, 4 decimal places
-                line = " ".join(f"{val:>{column_width}.4f}" for val in values)
-                # grab the date for this row
-                if date_cols:
-                    date_val = row[date_cols[0]]
-                else:
-                    date_val = row.name           # assuming a DatetimeIndex
-                # format it
-                date_str = date_val.strftime("%Y/%m/%d")
-                # 3append it
-                line = f"{line}  {date_str}"
-                
-                # Write the indented data line
-                f.write(" " * initial_spacing + line + "\n")
+            # 7b) Write the indented data lines (fixed width, 4 decimals, then the date) in bulk
+            if date_cols:
+                date_vals = flow_data[date_cols[0]]
+            else:
+                date_vals = flow_data.index           # assuming a DatetimeIndex
+            self._write_value_rows(f, flow_data[data_columns], date_vals,
+                                   f"%{column_width}.4f", prefix=" " * initial_spacing)
+
+        if subbasin_file:
+            self._write_subbasin_file(subbasin_file, data_columns, dict(zip(data_columns, site_details)))
+
+    @staticmethod
+    def _write_subbasin_file(file_path, data_columns, site_index):
+        """Write the Station_Number -> Subbasin table of the written columns as CSV."""
+        columns = ['Station_Number', 'Subbasin', 'Latitude', 'Longitude', 'Drainage_Area',
+                   'Snap_Distance_km', 'Area_Ratio']
+        rows = []
+        for station_id in data_columns:
+            info = site_index.get(station_id, {})
+            row = {col: info.get(col) for col in columns}
+            row['Station_Number'] = station_id
+            if row['Subbasin'] is None:
+                row['Subbasin'] = NO_MATCH
+            rows.append(row)
+        pd.DataFrame(rows, columns=columns).to_csv(file_path, index=False)
+
+    @staticmethod
+    def _write_value_rows(file_conn, values, dates, value_fmt, prefix="", chunk_rows=20000):
+        """
+        Write one '<prefix><values>  YYYY/MM/DD' line per time step in bulk.
+
+        The value matrix is formatted with one %-operation per block of
+        ``chunk_rows`` rows instead of one f-string per value, producing the
+        same text as ``" ".join(f"{v:{value_fmt}}" ...)`` line by line.
+
+        Parameters
+        ----------
+        file_conn : file object
+            Open text file.
+        values : pd.DataFrame
+            Values to write, one column per station.
+        dates : pd.Series or pd.Index
+            Date of each row: a DatetimeIndex, a datetime64 column, or
+            date/datetime objects.
+        value_fmt : str
+            printf-style format of one value (e.g. '%12.4f').
+        prefix : str
+            Text written at the start of every line.
+        chunk_rows : int
+            Number of rows formatted per write.
+
+        Raises
+        ------
+        TypeError
+            If the dates are not datetime-like (e.g. an integer or string index).
+        """
+        n_rows, n_cols = values.shape
+        row_fmt = prefix.replace("%", "%%") + " ".join([value_fmt] * n_cols) + "  %s\n"
+        if pd.api.types.is_datetime64_any_dtype(dates):
+            date_strs = np.asarray(pd.DatetimeIndex(dates).strftime("%Y/%m/%d"), dtype=object)
+        elif all(hasattr(d, 'strftime') for d in dates):
+            # e.g. an object column of datetime.date values
+            date_strs = np.array([d.strftime("%Y/%m/%d") for d in dates], dtype=object)
+        else:
+            raise TypeError(f"Dates must be datetime-like (a DatetimeIndex, datetime64 column or dates), "
+                            f"got dtype {getattr(dates, 'dtype', type(dates).__name__)}")
+        matrix = values.to_numpy(dtype=object)
+        for r0 in range(0, n_rows, chunk_rows):
+            block = np.column_stack([matrix[r0:r0 + chunk_rows], date_strs[r0:r0 + chunk_rows]])
+            file_conn.write((row_fmt * len(block)) % tuple(block.ravel().tolist()))
@@ -0,0 +1,287 @@
+"""
+Hydrometric Station Catalogue
+===============================================
+station_catalogue.py contains a class StationCatalogue, a typed, columnar store
+of hydrometric station metadata with a spatial index.
+
+The metadata returned by the different GenStreamflowFile fetchers use different
+keys (e.g. 'Drainage_Area' vs 'DRAINAGE_AREA_GROSS'); the catalogue maps them to
+one schema (`CATALOGUE_COLUMNS`) with drainage areas in km². It can be loaded in
+bulk from the GeoMet hydrometric-stations collection, saved to / loaded from
+Parquet, and queried with vectorized bbox and polygon (STRtree) searches.
+
+Example Usage
+-------------
+>>> from GeneralProcessing.gen_streamflow_file import GenStreamflowFile
+>>> from GeneralProcessing.station_catalogue import StationCatalogue
+>>> gen_flow = GenStreamflowFile()
+>>> catalogue = gen_flow.fetch_station_catalogue()
+>>> catalogue.save("hydrometric_stations.parquet")
+>>> catalogue = StationCatalogue.load("hydrometric_stations.parquet")
+>>> gauges = catalogue.within("basin.shp", active=True, real_time=True)
+>>> site_details = gauges.to_site_details()
+"""
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+# Unified catalogue schema: column name -> pandas dtype
+CATALOGUE_COLUMNS = {
+    'Station_Number':          'string',
+    'Station_Name':            'string',
+    'Source':                  'string',
+    'Province_State':          'string',
+    'Latitude':                'float64',
+    'Longitude':               'float64',
+    'Drainage_Area':           'float64',
+    'Effective_Drainage_Area': 'float64',
+    'Status':                  'string',
+    'Real_Time':               'boolean',
+    'RHBN':                    'boolean',
+    'Vertical_Datum':          'string',
+}
+
+# Source keys mapped to catalogue columns (first key present wins)
+_KEY_MAP = {
+    'Station_Number':          ('Station_Number', 'STATION_NUMBER', 'site_no'),
+    'Station_Name':            ('Station_Name', 'STATION_NAME', 'station_nm'),
+    'Province_State':          ('PROV_TERR_STATE_LOC', 'Province_State'),
+    'Latitude':                ('Latitude', 'LATITUDE', 'dec_lat_va'),
+    'Longitude':               ('Longitude', 'LONGITUDE', 'dec_long_va'),
+    'Drainage_Area':           ('DRAINAGE_AREA_GROSS', 'Drainage_Area', 'drain_area_va'),
+    'Effective_Drainage_Area': ('DRAINAGE_AREA_EFFECT', 'Contrib_Drainage_Area', 'contrib_drain_area_va'),
+    'Status':                  ('STATUS_EN', 'Status'),
+    'Real_Time':               ('REAL_TIME', 'Real_Time'),
+    'RHBN':                    ('RHBN',),
+    'Vertical_Datum':          ('VERTICAL_DATUM', 'Datum', 'vertical_datum'),
+}
+
+# USGS drainage areas are in square miles
+SQ_MILES_TO_KM2 = 2.589988
+
+class StationCatalogue:
+    """
+    Columnar station metadata store with vectorized spatial queries.
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        Station table with (at least some of) the `CATALOGUE_COLUMNS`;
+        missing columns are added and all columns cast to the schema dtypes.
+    """
+
+    def __init__(self, frame):
+        frame = frame.copy()
+        for col, dtype in CATALOGUE_COLUMNS.items():
+            if col not in frame.columns:
+                frame[col] = np.nan if dtype == 'float64' else pd.NA
+            elif dtype == 'float64':
+                frame[col] = pd.to_numeric(frame[col], errors='coerce')
+            frame[col] = frame[col].astype(dtype)
+        self.frame = frame[list(CATALOGUE_COLUMNS)].reset_index(drop=True)
+        self._tree = None
+        self._index = None
+
+    # ─── construction / persistence ───────────────────────────────────────────────
+
+    @classmethod
+    def from_features(cls, features, source='CA'):
+        """
+        Build a catalogue from GeoJSON features of the hydrometric-stations collection.
+
+        Parameters
+        ----------
+        features : list of dict
+            GeoJSON features with 'properties' and Point 'geometry'.
+        source : str
+            Value of the 'Source' column.
+        """
+        if not features:
+            return cls(pd.DataFrame())
+        frame = pd.json_normalize([f['properties'] for f in features])
+        coords = np.array([f['geometry']['coordinates'][:2] if f.get('geometry') else (np.nan, np.nan)
+                           for f in features], dtype=float)
+        frame['Longitude'] = coords[:, 0]
+        frame['Latitude'] = coords[:, 1]
+        return cls._from_records_frame(frame, source)
+
+    @classmethod
+    def from_station_info(cls, station_info, source):
+        """
+        Build a catalogue from the station metadata lists returned by GenStreamflowFile.
+
+        Placeholder entries of unknown stations (-1 coordinates) get NaN
+        coordinates. For ``source='US'`` drainage areas are converted from
+        square miles to km².
+
+        Parameters
+        ----------
+        station_info : list of dict
+            Output metadata of e.g. ``fetch_hydrometric_data_ca`` or
+            ``extract_flow_data_us_with_metadata``.
+        source : str
+            'CA' or 'US'.
+        """
+        frame = pd.DataFrame(station_info)
+        if 'Station_Name' in frame.columns:
+            unknown = frame['Station_Name'].eq('Unknown')
+            for col in ('Latitude', 'Longitude'):
+                if col in frame.columns:
+                    frame[col] = pd.to_numeric(frame[col], errors='coerce').mask(unknown)
+        return cls._from_records_frame(frame, source)
+
+    @classmethod
+    def _from_records_frame(cls, frame, source):
+        """Map source keys to the catalogue schema."""
+        out = pd.DataFrame(index=frame.index)
+        for col, keys in _KEY_MAP.items():
+            key = next((k for k in keys if k in frame.columns), None)
+            out[col] = frame[key] if key is not None else pd.NA
+        for col in ('Latitude', 'Longitude', 'Drainage_Area', 'Effective_Drainage_Area'):
+            out[col] = pd.to_numeric(out[col], errors='coerce')
+        for col in ('Real_Time', 'RHBN'):
+            out[col] = out[col].map(_to_bool, na_action='ignore').astype('boolean')
+        if source == 'US':
+            out['Drainage_Area'] *= SQ_MILES_TO_KM2
+            out['Effective_Drainage_Area'] *= SQ_MILES_TO_KM2
+        out['Source'] = source
+        return cls(out)
+
+    @classmethod
+    def concat(cls, catalogues):
+        """Combine catalogues, keeping the first entry of each station number."""
+        frame = pd.concat([c.frame for c in catalogues], ignore_index=True)
+        return cls(frame.drop_duplicates('Station_Number', keep='first'))
+
+    def save(self, path):
+        """Save the catalogue to a Parquet file."""
+        self.frame.to_parquet(path, index=False)
+
+    @classmethod
+    def load(cls, path):
+        """Load a catalogue saved with ``save``."""
+        return cls(pd.read_parquet(path))
+
+    # ─── queries ──────────────────────────────────────────────────────────────────
+
+    def __len__(self):
+        return len(self.frame)
+
+    def lookup(self, station_numbers):
+        """
+        Return the catalogue rows of the given stations, in the given order.
+
+        Unknown stations are omitted.
+        """
+        if self._index is None:
+            numbers = self.frame['Station_Number']
+            self._index = pd.Series(np.arange(len(numbers)), index=numbers.astype(object))
+            self._index = self._index[~self._index.index.duplicated()]
+        positions = self._index.reindex(list(station_numbers)).dropna().astype(int)
+        return self._subset(positions.to_numpy())
+
+    def in_bbox(self, min_lon, min_lat, max_lon, max_lat, **filters):
+        """
+        Stations inside a lon/lat bounding box (edges included).
+
+        ``filters`` are passed to ``filter``.
+        """
+        lon = self.frame['Longitude'].to_numpy(dtype=float, na_value=np.nan)
+        lat = self.frame['Latitude'].to_numpy(dtype=float, na_value=np.nan)
+        mask = (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+        return self._subset(np.flatnonzero(mask)).filter(**filters)
+
+    def within(self, basin, **filters):
+        """
+        Stations inside (or on the boundary of) the polygons of a basin.
+
+        Parameters
+        ----------
+        basin : str, geopandas.GeoDataFrame/GeoSeries or shapely geometry
+            Basin shapefile path, layer or geometry. Layers are reprojected
+            to EPSG:4326; a bare geometry is assumed to be in lon/lat.
+        **filters
+            Passed to ``filter`` (e.g. active=True).
+        """
+        if isinstance(basin, str):
+            basin = gpd.read_file(basin)
+        if isinstance(basin, (gpd.GeoDataFrame, gpd.GeoSeries)):
+            if basin.crs is not None:
+                basin = basin.to_crs(epsg=4326)
+            polygons = np.asarray(basin.geometry.values)
+        else:
+            polygons = np.atleast_1d(np.asarray(basin, dtype=object))
+
+        tree, tree_rows = self._spatial_index()
+        _, hits = tree.query(polygons, predicate='intersects')
+        return self._subset(np.unique(tree_rows[hits])).filter(**filters)
+
+    def filter(self, active=None, real_time=None, source=None, min_area=None, max_area=None):
+        """
+        Vectorized attribute filter.
+
+        Parameters
+        ----------
+        active : bool, optional
+            Keep stations whose Status is (not) 'Active'.
+        real_time : bool, optional
+            Keep stations with (without) real-time data.
+        source : str, optional
+            Keep stations of one source ('CA' or 'US').
+        min_area, max_area : float, optional
+            Drainage area bounds in km².
+        """
+        f = self.frame
+        mask = np.ones(len(f), dtype=bool)
+        if active is not None:
+            mask &= f['Status'].str.lower().eq('active').fillna(False).to_numpy(dtype=bool) == active
+        if real_time is not None:
+            mask &= f['Real_Time'].fillna(False).to_numpy(dtype=bool) == real_time
+        if source is not None:
+            mask &= f['Source'].eq(source).fillna(False).to_numpy(dtype=bool)
+        if min_area is not None:
+            mask &= f['Drainage_Area'].ge(min_area).fillna(False).to_numpy(dtype=bool)
+        if max_area is not None:
+            mask &= f['Drainage_Area'].le(max_area).fillna(False).to_numpy(dtype=bool)
+        return self if mask.all() else self._subset(np.flatnonzero(mask))
+
+    # ─── export ───────────────────────────────────────────────────────────────────
+
+    def to_site_details(self):
+        """
+        Return the stations as the site_details list of dicts used by the writers
+        (Station_Number, Station_Name, Latitude, Longitude, Drainage_Area [km²]).
+        """
+        cols = ['Station_Number', 'Station_Name', 'Latitude', 'Longitude', 'Drainage_Area']
+        frame = self.frame[cols].astype(object).where(self.frame[cols].notna(), None)
+        return frame.to_dict('records')
+
+    def to_geodataframe(self):
+        """Return the catalogue as a point GeoDataFrame in EPSG:4326."""
+        return gpd.GeoDataFrame(
+            self.frame,
+            geometry=gpd.points_from_xy(self.frame['Longitude'], self.frame['Latitude']),
+            crs='EPSG:4326'
+        )
+
+    # ─── internals ────────────────────────────────────────────────────────────────
+
+    def _subset(self, positions):
+        return StationCatalogue(self.frame.iloc[positions])
+
+    def _spatial_index(self):
+        """STRtree of the stations with coordinates, and the catalogue row of each tree item."""
+        if self._tree is None:
+            lon = self.frame['Longitude'].to_numpy(dtype=float, na_value=np.nan)
+            lat = self.frame['Latitude'].to_numpy(dtype=float, na_value=np.nan)
+            rows = np.flatnonzero(~(np.isnan(lon) | np.isnan(lat)))
+            self._tree = (shapely.STRtree(shapely.points(lon[rows], lat[rows])), rows)
+        return self._tree
+
+def _to_bool(value):
+    """Interpret the 0/1, bool and 'Y'/'N' flags used by the services."""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'y', 'yes')
+    return bool(value)
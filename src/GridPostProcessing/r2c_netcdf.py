@@ -0,0 +1,292 @@
+"""
+r2c_netcdf.py
+
+Convert EnSim-format .r2c grids (static parameter files and :Frame time series)
+to CF-compliant, chunked NetCDF and back.
+
+Both directions stream one frame at a time, so files of any length are
+converted with a single frame in memory. Cell-centre coordinates are built
+from the ':xOrigin/:yOrigin/:xDelta/:yDelta/:xCount/:yCount' header (the
+origin is the lower-left corner of the grid), and the original header lines
+are kept as 'r2c_*' global attributes so a round trip restores them.
+
+Example Usage:
+--------------
+>>> from GridPostProcessing.r2c_netcdf import r2c_to_netcdf, netcdf_to_r2c
+>>> r2c_to_netcdf('MESH_input_forcing.r2c', 'MESH_input_forcing.nc')
+>>> netcdf_to_r2c('MESH_input_forcing.nc', 'MESH_input_forcing_copy.r2c')
+"""
+
+import re
+import datetime
+import numpy as np
+import netCDF4
+from GridPostProcessing.r2c_utils import (
+    R2CTimeSeries, R2CTimeSeriesWriter, R2C_WRITE_FORMAT,
+    write_new_r2c, clean_attribute_name
+)
+
+# Time format of the ':Frame' lines of r2c time series
+R2C_TIME_FORMAT = '%Y/%m/%d %H:%M:%S.%f'
+
+# Header keys rebuilt from the NetCDF coordinates rather than copied
+_GRID_KEYS = (':xOrigin', ':yOrigin', ':xCount', ':yCount', ':xDelta', ':yDelta')
+
+def r2c_to_netcdf(r2c_path, nc_path, time_units='hours since 1900-01-01 00:00:00',
+                  calendar='standard', complevel=4, time_chunk=1):
+    """
+    Convert an r2c file to a CF-compliant NetCDF file, one frame at a time.
+
+    Each r2c attribute becomes a variable of shape (time, y, x) for time-series
+    files, or (y, x) for static files without ':Frame' blocks. If some ':Frame'
+    lines have no time stamp, the time coordinate holds the frame step numbers
+    instead of CF times.
+
+    Parameters
+    ----------
+    r2c_path : str
+        Path to the input .r2c file.
+    nc_path : str
+        Path of the output NetCDF file.
+    time_units : str, optional
+        CF units of the output time coordinate.
+    calendar : str, optional
+        CF calendar of the output time coordinate.
+    complevel : int, optional
+        zlib compression level of the data variables (0 disables compression).
+    time_chunk : int, optional
+        Number of frames per NetCDF storage chunk (default 1, i.e. one frame
+        per chunk for fast map access).
+
+    Example
+    -------
+    >>> r2c_to_netcdf('MESH_parameters.r2c', 'MESH_parameters.nc')
+    """
+    with R2CTimeSeries(r2c_path) as ts:
+        header = ts.header_info
+        times = [info['time'] for info in ts.frame_info]
+        has_time = ts.has_frames
+        has_stamps = has_time and all(times)
+
+        out = netCDF4.Dataset(nc_path, 'w', format='NETCDF4')
+        try:
+            x_name, y_name = _create_grid(out, header, ts.n_rows, ts.n_cols)
+            dims = (y_name, x_name)
+            chunks = (ts.n_rows, ts.n_cols)
+            if has_time:
+                out.createDimension('time', None)
+                time_var = out.createVariable('time', 'f8', ('time',))
+                if has_stamps:
+                    time_var.setncatts({'standard_name': 'time', 'units': time_units, 'calendar': calendar})
+                else:
+                    time_var.setncatts({'long_name': 'r2c frame step', 'units': '1'})
+                dims = ('time',) + dims
+                chunks = (time_chunk,) + chunks
+
+            attr_ids = list(ts.attributes) or [1]
+            var_names = _variable_names(ts.attributes, attr_ids)
+            variables = []
+            for attr_id, var_name in zip(attr_ids, var_names):
+                meta = ts.attributes.get(attr_id, {})
+                var = out.createVariable(var_name, 'f4', dims, zlib=complevel > 0, complevel=complevel or 1,
+                                         chunksizes=chunks, fill_value=np.float32(np.nan))
+                attrs = {'long_name': meta.get('name') or var_name, 'r2c_attribute_id': attr_id,
+                         'grid_mapping': 'crs'}
+                if meta.get('units'):
+                    attrs['units'] = meta['units']
+                if meta.get('type'):
+                    attrs['r2c_attribute_type'] = meta['type']
+                var.setncatts(attrs)
+                variables.append(var)
+
+            out.setncatts(_header_attributes(header))
+            out.setncatts({
+                'Conventions': 'CF-1.6',
+                'history': f"Converted from {r2c_path} on {datetime.datetime.now():%b %d, %Y}"
+            })
+
+            # stream frames
+            for i, frame in enumerate(ts):
+                if has_time:
+                    if has_stamps:
+                        time_var[i] = netCDF4.date2num(_parse_frame_time(times[i]), time_units, calendar)
+                    else:
+                        time_var[i] = ts.frame_info[i]['step']
+                    for var, grid in zip(variables, frame):
+                        var[i, :, :] = grid
+                else:
+                    for var, grid in zip(variables, frame):
+                        var[:, :] = grid
+        finally:
+            out.close()
+    print(f"Converted {r2c_path} -> {nc_path}")
+
+def netcdf_to_r2c(nc_path, r2c_path, variables=None, fmt=R2C_WRITE_FORMAT):
+    """
+    Convert a gridded NetCDF file back to an r2c file, one frame at a time.
+
+    The grid header is rebuilt from the x/y (or lon/lat) cell-centre
+    coordinates; other header lines are restored from 'r2c_*' global
+    attributes written by ``r2c_to_netcdf`` when present.
+
+    Parameters
+    ----------
+    nc_path : str
+        Path to the input NetCDF file.
+    r2c_path : str
+        Path of the output .r2c file.
+    variables : list of str, optional
+        Variables to write, in attribute order. Defaults to every variable
+        defined on the (y, x) or (time, y, x) grid.
+    fmt : str, optional
+        printf-style format of the written values.
+
+    Example
+    -------
+    >>> netcdf_to_r2c('MESH_parameters.nc', 'MESH_parameters.r2c', fmt='%.5f')
+    """
+    nc = netCDF4.Dataset(nc_path, 'r')
+    try:
+        x_name, y_name = _grid_dimensions(nc)
+        if variables is None:
+            variables = [name for name, var in nc.variables.items()
+                         if var.dimensions[-2:] == (y_name, x_name) and var.ndim in (2, 3)]
+        if not variables:
+            raise ValueError(f"No ({y_name}, {x_name}) grid variables found in {nc_path}")
+        has_time = nc.variables[variables[0]].ndim == 3
+
+        header, flip = _netcdf_header(nc, x_name, y_name)
+        attributes = {}
+        for i, name in enumerate(variables, start=1):
+            var = nc.variables[name]
+            attributes[i] = {
+                'name': getattr(var, 'long_name', name) if hasattr(var, 'r2c_attribute_id') else name,
+                'type': getattr(var, 'r2c_attribute_type', None),
+                'units': getattr(var, 'units', None)
+            }
+
+        def grid(name, *index):
+            data = np.ma.filled(nc.variables[name][index + (slice(None), slice(None))].astype(float), np.nan)
+            return data[::-1] if flip else data
+
+        if not has_time:
+            write_new_r2c(r2c_path, header, attributes,
+                          {attributes[i]['name']: grid(name) for i, name in enumerate(variables, start=1)},
+                          fmt=fmt)
+        else:
+            time_var = nc.variables['time']
+            if ' since ' in getattr(time_var, 'units', ''):
+                times = netCDF4.num2date(time_var[:], time_var.units, getattr(time_var, 'calendar', 'standard'))
+                steps = [None] * len(times)
+            else:
+                # frame step numbers of r2c files without frame time stamps
+                steps = [int(step) for step in np.asarray(time_var[:])]
+                times = [None] * len(steps)
+            with R2CTimeSeriesWriter(r2c_path, header, attributes, fmt=fmt) as writer:
+                for t, (time, step) in enumerate(zip(times, steps)):
+                    frame = np.stack([grid(name, t) for name in variables])
+                    writer.write_frame(frame, time=time, step=step)
+    finally:
+        nc.close()
+    print(f"Converted {nc_path} -> {r2c_path}")
+
+def _create_grid(out, header, n_rows, n_cols):
+    """Create the cell-centre coordinates and grid mapping of an r2c header; return (x_name, y_name)."""
+    x_origin, y_origin = float(header[':xOrigin']), float(header[':yOrigin'])
+    x_delta = float(header[':xDelta'])
+    y_delta = float(header.get(':yDelta', x_delta))
+    geographic = header.get(':Projection', 'LATLONG').upper() in ('LATLONG', 'LATLON', 'GEOGRAPHIC')
+
+    x_name, y_name = ('lon', 'lat') if geographic else ('x', 'y')
+    out.createDimension(y_name, n_rows)
+    out.createDimension(x_name, n_cols)
+    x_var = out.createVariable(x_name, 'f8', (x_name,))
+    y_var = out.createVariable(y_name, 'f8', (y_name,))
+    x_var[:] = x_origin + (np.arange(n_cols) + 0.5) * x_delta
+    y_var[:] = y_origin + (np.arange(n_rows) + 0.5) * y_delta
+
+    crs_var = out.createVariable('crs', 'i4')
+    if geographic:
+        x_var.setncatts({'standard_name': 'longitude', 'long_name': 'longitude', 'units': 'degrees_east', 'axis': 'X'})
+        y_var.setncatts({'standard_name': 'latitude', 'long_name': 'latitude', 'units': 'degrees_north', 'axis': 'Y'})
+        crs_var.setncatts({
+            'grid_mapping_name': 'latitude_longitude',
+            'longitude_of_prime_meridian': 0.0,
+            'semi_major_axis': 6378137.0,
+            'inverse_flattening': 298.257223563
+        })
+    else:
+        x_var.setncatts({'standard_name': 'projection_x_coordinate', 'units': 'm', 'axis': 'X'})
+        y_var.setncatts({'standard_name': 'projection_y_coordinate', 'units': 'm', 'axis': 'Y'})
+        crs_var.setncatts({'r2c_projection': header.get(':Projection', '')})
+    crs_var.assignValue(1)
+    return x_name, y_name
+
+def _variable_names(attributes, attr_ids):
+    """Return unique NetCDF-safe variable names for r2c attributes."""
+    names = []
+    for attr_id in attr_ids:
+        raw = clean_attribute_name(attributes.get(attr_id, {}).get('name') or '')
+        name = re.sub(r'[^0-9A-Za-z_]+', '_', raw).strip('_') or f'attribute_{attr_id}'
+        if name[0].isdigit():
+            name = f'attr_{name}'
+        if name in names:
+            name = f'{name}_{attr_id}'
+        names.append(name)
+    return names
+
+def _header_attributes(header):
+    """Return the non-grid r2c header lines as 'r2c_<Key>' global attributes."""
+    return {f"r2c_{key.lstrip(':')}": val for key, val in header.items()
+            if key not in _GRID_KEYS and val != ''}
+
+def _parse_frame_time(time):
+    """Parse an r2c frame time stamp such as '2004/09/01 0:00:00.000'."""
+    time = time.strip()
+    if '.' not in time.rsplit(':', 1)[-1]:
+        time += '.000'
+    return datetime.datetime.strptime(time, R2C_TIME_FORMAT)
+
+def _format_number(value):
+    """Format a header number without floating-point noise from the coordinate arithmetic."""
+    return repr(float(np.round(value, 10)))
+
+def _grid_dimensions(nc):
+    """Return the (x, y) dimension names of a gridded NetCDF dataset."""
+    for x_name, y_name in (('lon', 'lat'), ('x', 'y'), ('longitude', 'latitude'), ('rlon', 'rlat')):
+        if x_name in nc.dimensions and y_name in nc.dimensions:
+            return x_name, y_name
+    raise ValueError("Could not identify x/y (or lon/lat) grid dimensions")
+
+def _netcdf_header(nc, x_name, y_name):
+    """
+    Build an r2c header from NetCDF coordinates and 'r2c_*' global attributes.
+
+    Returns the header dict and whether rows must be flipped to run south to north.
+    """
+    x = np.asarray(nc.variables[x_name][:], dtype=float)
+    y = np.asarray(nc.variables[y_name][:], dtype=float)
+    if len(x) < 2 or len(y) < 2:
+        raise ValueError("At least two cells per axis are needed to derive the r2c grid spacing")
+    flip = y[1] < y[0]
+    if flip:
+        y = y[::-1]
+    x_delta = (x[-1] - x[0]) / (len(x) - 1)
+    y_delta = (y[-1] - y[0]) / (len(y) - 1)
+
+    header = {':FileType': 'r2c  ASCII  EnSim 1.0'}
+    header[':Projection'] = 'LATLONG' if x_name in ('lon', 'longitude') else 'UNKNOWN'
+    if x_name in ('lon', 'longitude'):
+        header[':Ellipsoid'] = 'WGS84'
+    for name in nc.ncattrs():
+        if name.startswith('r2c_'):
+            header[':' + name[len('r2c_'):]] = str(nc.getncattr(name))
+    header.update({
+        ':xOrigin': _format_number(x[0] - x_delta / 2),
+        ':yOrigin': _format_number(y[0] - y_delta / 2),
+        ':xCount': str(len(x)),
+        ':yCount': str(len(y)),
+        ':xDelta': _format_number(x_delta),
+        ':yDelta': _format_number(y_delta)
+    })
+    return header, flip
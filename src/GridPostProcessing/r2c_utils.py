@@ -9,23 +9,57 @@ reorder MATLAB GRU data arrays, convert to 2D grids, clean attribute names,
 and produce small-multiples georeferenced plots (absolute or difference).
 """
 
+import os
+import json
+import hashlib
 import numpy as np
 import re
+import mmap
 import numpy as np
 import geopandas as gpd
+from scipy.io import loadmat
+import matplotlib
 import matplotlib.pyplot as plt
 from math import ceil
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 from mpl_toolkits.axes_grid1.inset_locator import inset_axes
 
-def read_r2c_file(file_path):
+# Approximate number of bytes of r2c data converted per chunk by read_r2c_file
+R2C_READ_CHUNK_SIZE = 2 ** 24
+
+# Default printf-style format of grid values written to r2c files ('%s' writes
+# str() of each value, i.e. the shortest text that round-trips)
+R2C_WRITE_FORMAT = '%s'
+
+# Buffer size of the text stream used when writing r2c files
+R2C_WRITE_BUFFER_SIZE = 2 ** 20
+
+def read_r2c_file(file_path, chunk_size=R2C_READ_CHUNK_SIZE, cache=False, cache_dir=None):
     """
     Read an EnSim‐format .r2c ASCII file and return header info, attribute metadata,
     and the 3D data array.
 
+    The file is opened once: the header is parsed line by line, then the data
+    block is tokenized in chunks of about ``chunk_size`` bytes and converted in
+    bulk straight into a preallocated float array.
+
+    With ``cache=True`` the parsed result is stored in a binary sidecar (a
+    ``.npy`` data file plus a ``.json`` header file) keyed by the source path,
+    size and modification time. Later reads of an unchanged file memory-map the
+    ``.npy`` instead of parsing text, so pages are shared between processes;
+    a changed source file invalidates and rebuilds the sidecar.
+
     Parameters
     ----------
     file_path : str
         Path to the .r2c file.
+    chunk_size : int, optional
+        Approximate number of bytes of the data block converted at a time.
+    cache : bool, optional
+        Read from / write to the binary cache sidecar (default False).
+    cache_dir : str, optional
+        Directory of the cache sidecars. Defaults to the directory of ``file_path``.
 
     Returns
     -------
@@ -34,57 +68,119 @@ def read_r2c_file(file_path):
     attributes : dict[int, dict]
         Mapping from attribute ID → {'name': str, 'type': str|None, 'units': str|None}.
     data_matrix : np.ndarray, shape (n_attributes, n_rows, n_cols)
-        The numeric grid values, reshaped according to header counts.
+        The numeric grid values, reshaped according to header counts. When read
+        from the cache this is a read-only memory map; copy it before modifying.
+
+    Example
+    -------
+    >>> header, attrs, data = read_r2c_file('MESH_parameters.r2c', cache=True)
     """
-    header_info = {}
-    attributes  = {}
-    data_values = []
+    if cache:
+        return _read_r2c_cached(file_path, chunk_size, cache_dir)
 
-    # ─── 1) Parse header ─────────────────────────────────────────────────────────
-    with open(file_path, 'r') as f:
-        line = f.readline().strip()
-        while ':EndHeader' not in line:
-            if line.startswith(':'):
-                parts = line.split()
-                key   = parts[0]
-                if 'Attribute' not in key:
-                    header_info[key] = ' '.join(parts[1:])
-                else:
-                    attr_id   = int(parts[1])
-                    meta_dict = attributes.setdefault(
-                        attr_id, {'name': None, 'type': None, 'units': None}
-                    )
-                    if 'AttributeName' in key:
-                        meta_dict['name'] = ' '.join(parts[2:])
-                    elif 'AttributeType' in key:
-                        meta_dict['type'] = ' '.join(parts[2:])
-                    elif 'AttributeUnits' in key:
-                        meta_dict['units'] = ' '.join(parts[2:])
-            line = f.readline().strip()
-
-    # ─── 2) Read numeric grid values ───────────────────────────────────────────────
     with open(file_path, 'r') as f:
-        # skip header
-        for line in f:
-            if line.strip() == ':EndHeader':
+        # ─── 1) Parse header ─────────────────────────────────────────────────────
+        header_info, attributes = _read_r2c_header(f)
+
+        # ─── 2) Read numeric grid values into a preallocated array ──────────────
+        n_cols       = int(header_info[':xCount'])
+        n_rows       = int(header_info[':yCount'])
+        n_attributes = len(attributes)
+        expected = n_attributes * n_rows * n_cols
+
+        data_matrix = np.empty(expected, dtype=float)
+        n_values = 0
+        while True:
+            lines = f.readlines(chunk_size)
+            if not lines:
                 break
-        # read values
-        for line in f:
-            data_values.extend([float(tok) for tok in line.split()])
-
-    # ─── 3) Reshape into (attrs, rows, cols) ──────────────────────────────────────
-    n_cols       = int(header_info[':xCount'])
-    n_rows       = int(header_info[':yCount'])
-    n_attributes = len(attributes)
-    expected = n_attributes * n_rows * n_cols
-    if len(data_values) != expected:
-        raise ValueError(f"Expected {expected} values, got {len(data_values)}")
-
-    data_matrix = np.array(data_values, dtype=float)
+            values = np.array(''.join(lines).split(), dtype=float)
+            if n_values + values.size <= expected:
+                data_matrix[n_values:n_values + values.size] = values
+            n_values += values.size
+
+    # ─── 3) Reshape into (attrs, rows, cols) ─────────────────────────────────────
+    if n_values != expected:
+        raise ValueError(f"Expected {expected} values, got {n_values}")
+
     data_matrix = data_matrix.reshape((n_attributes, n_rows, n_cols))
 
     return header_info, attributes, data_matrix
 
+def _r2c_cache_paths(file_path, cache_dir=None):
+    """Return the (.npy, .json) sidecar paths for an r2c file."""
+    file_path = os.path.abspath(file_path)
+    digest = hashlib.sha1(file_path.encode('utf-8')).hexdigest()[:16]
+    base = os.path.join(cache_dir or os.path.dirname(file_path),
+                        f"{os.path.basename(file_path)}.{digest}")
+    return base + '.npy', base + '.json'
+
+def _read_r2c_cached(file_path, chunk_size, cache_dir=None):
+    """
+    ``read_r2c_file`` through the binary cache sidecar.
+
+    The sidecar is valid when its recorded path, size and mtime match the
+    source file; otherwise the source is parsed and the sidecar rewritten.
+    """
+    stat = os.stat(file_path)
+    key = {'path': os.path.abspath(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    npy_path, json_path = _r2c_cache_paths(file_path, cache_dir)
+
+    try:
+        with open(json_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('key') == key:
+            data_matrix = np.load(npy_path, mmap_mode='r')
+            attributes = {int(k): v for k, v in meta['attributes'].items()}
+            return meta['header_info'], attributes, data_matrix
+    except (OSError, ValueError, KeyError):
+        pass  # missing or unreadable sidecar: rebuild it
+
+    header_info, attributes, data_matrix = read_r2c_file(file_path, chunk_size)
+
+    # write both files under temporary names so concurrent readers never see a partial sidecar
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    suffix = f".{os.getpid()}.part"
+    with open(npy_path + suffix, 'wb') as f:
+        np.save(f, data_matrix)
+    with open(json_path + suffix, 'w') as f:
+        json.dump({'key': key, 'header_info': header_info, 'attributes': attributes}, f)
+    os.replace(npy_path + suffix, npy_path)
+    os.replace(json_path + suffix, json_path)
+
+    return header_info, attributes, np.load(npy_path, mmap_mode='r')
+
+def _read_r2c_header(f):
+    """
+    Parse an r2c header from an open file, leaving it positioned after ':EndHeader'.
+
+    Returns the (header_info, attributes) pair described in ``read_r2c_file``.
+    """
+    header_info = {}
+    attributes  = {}
+    for line in f:
+        line = line.strip()
+        if ':EndHeader' in line:
+            return header_info, attributes
+        if line.startswith(':'):
+            parts = line.split()
+            key   = parts[0]
+            if 'Attribute' not in key:
+                header_info[key] = ' '.join(parts[1:])
+            else:
+                attr_id   = int(parts[1])
+                meta_dict = attributes.setdefault(
+                    attr_id, {'name': None, 'type': None, 'units': None}
+                )
+                if 'AttributeName' in key:
+                    meta_dict['name'] = ' '.join(parts[2:])
+                elif 'AttributeType' in key:
+                    meta_dict['type'] = ' '.join(parts[2:])
+                elif 'AttributeUnits' in key:
+                    meta_dict['units'] = ' '.join(parts[2:])
+    raise ValueError("No ':EndHeader' line found in r2c file")
+
 def reorder_attributes(attribute_data, new_order_ids, attributes):
     """
     Reorder a flat name→2D-array dict according to a list of attribute IDs.
@@ -133,6 +229,10 @@ def reorder_matlab_data(gru_data, order_ids):
     -------
     np.ndarray of object, shape (len(order_ids),)
         Each entry is the original gru_data[field][0,0] in the new sequence.
+
+    See Also
+    --------
+    stack_matlab_fields : reorder straight into a contiguous 2D float array.
     """
     # get original field names
     field_names = [name for name, _ in gru_data.dtype.descr]
@@ -169,10 +269,132 @@ def convert_to_2d(gru_data):
     return gru_data
 
 
-def write_new_r2c(new_file_path, header_info, ordered_attributes, attribute_data):
+def load_matlab_struct(mat_path, var_name):
+    """
+    Load a MATLAB struct variable, lazily for HDF5-based v7.3 files.
+
+    Files saved with ``-v7`` or older are read with ``scipy.io.loadmat`` and
+    the 1×1 struct array is returned. v7.3 files are opened with h5py and the
+    struct's HDF5 group is returned without reading any field, so fields are
+    only read when ``stack_matlab_fields`` copies them into its output. The
+    group keeps the file open; close it with ``group.file.close()``.
+
+    Parameters
+    ----------
+    mat_path : str
+        Path to the .mat file.
+    var_name : str
+        Name of the struct variable (e.g. 'GRU').
+
+    Returns
+    -------
+    np.ndarray or h5py.Group
+        The struct, usable as ``gru_data`` in ``stack_matlab_fields``.
+
+    Example
+    -------
+    >>> gru = load_matlab_struct('GRU_fractions.mat', 'GRU')
+    >>> fractions = stack_matlab_fields(gru, order_ids=[3, 1, 2])
+    """
+    try:
+        return loadmat(mat_path, variable_names=[var_name])[var_name]
+    except NotImplementedError:
+        # MATLAB v7.3 files are HDF5
+        try:
+            import h5py
+        except ImportError as e:
+            raise ImportError("h5py is required to read MATLAB v7.3 files.") from e
+        return h5py.File(mat_path, 'r')[var_name]
+
+
+def matlab_field_names(gru_data):
+    """
+    Return the field names of a MATLAB struct in their MATLAB order.
+
+    Parameters
+    ----------
+    gru_data : np.ndarray or h5py.Group
+        A struct from ``scipy.io.loadmat`` or ``load_matlab_struct``.
+
+    Returns
+    -------
+    list of str
+    """
+    if isinstance(gru_data, np.ndarray):
+        return [name for name, _ in gru_data.dtype.descr]
+    # v7.3 groups list fields alphabetically; MATLAB keeps its order in an attribute
+    if 'MATLAB_fields' in gru_data.attrs:
+        return [np.asarray(name).tobytes().decode('ascii') for name in gru_data.attrs['MATLAB_fields']]
+    return list(gru_data.keys())
+
+
+def stack_matlab_fields(gru_data, order_ids=None, dtype=float):
+    """
+    Copy MATLAB struct fields straight into one contiguous (n_fields, n) array.
+
+    Each field is flattened into one row: it is written once into a
+    preallocated array, and fields of a v7.3 HDF5 group are read from disk
+    directly into their row. Multi-dimensional fields are flattened in the
+    same (row-major) order for both file versions.
+
+    For row-vector (1, n) fields the result equals
+    ``convert_to_2d(reorder_matlab_data(gru_data, order_ids))`` without its
+    intermediate object array and ``np.vstack`` copy. For other shapes it
+    differs: ``np.vstack`` stacks (n, 1) fields into one (n_fields * n, 1)
+    column, whereas here every field is still one row of n values.
+
+    Parameters
+    ----------
+    gru_data : np.ndarray or h5py.Group
+        A 1×1 struct array from scipy.io.loadmat, or a struct group from
+        ``load_matlab_struct``.
+    order_ids : list[int], optional
+        1-based indices of the fields in the output order. Defaults to all
+        fields in their original order.
+    dtype : data-type, optional
+        Output dtype (default float).
+
+    Returns
+    -------
+    np.ndarray, shape (len(order_ids), n)
+
+    Raises
+    ------
+    ValueError
+        If the selected fields do not all have the same number of values.
+    """
+    field_names = matlab_field_names(gru_data)
+    if order_ids is None:
+        order_ids = range(1, len(field_names) + 1)
+    fields = [field_names[i-1] for i in order_ids]
+    is_struct_array = isinstance(gru_data, np.ndarray)
+
+    def field(name):
+        return gru_data[name][0, 0] if is_struct_array else gru_data[name]
+
+    n = int(np.prod(field(fields[0]).shape)) if fields else 0
+    stacked = np.empty((len(fields), n), dtype=dtype)
+    for k, name in enumerate(fields):
+        values = field(name)
+        if int(np.prod(values.shape)) != n:
+            raise ValueError(f"Field '{name}' has {int(np.prod(values.shape))} values, expected {n}")
+        if is_struct_array:
+            stacked[k] = np.ravel(values)
+        elif sum(d > 1 for d in values.shape) <= 1:
+            values.read_direct(stacked[k].reshape(values.shape))
+        else:
+            # v7.3 stores arrays column-major, i.e. transposed relative to loadmat
+            stacked[k] = np.ravel(values[()], order='F')
+    return stacked
+
+
+def write_new_r2c(new_file_path, header_info, ordered_attributes, attribute_data, fmt=R2C_WRITE_FORMAT):
     """
     Write a new .r2c file from header info, attribute metadata, and grid data.
 
+    Each grid is formatted in bulk with a single printf-style format string and
+    written through one buffered text stream.
+
     Parameters
     ----------
     new_file_path : str
@@ -183,28 +405,265 @@ def write_new_r2c(new_file_path, header_info, ordered_attributes, attribute_data
         Attribute ID→metadata dict specifying write order.
     attribute_data : dict[str, np.ndarray]
         Mapping attribute name→2D array of shape (n_rows, n_cols).
+    fmt : str, optional
+        printf-style format of one value (default '%s', the full precision
+        str() of each value). Use e.g. '%.4f' for fixed decimals or '%.7g'
+        for smaller files at the single precision read by MESH.
+
+    Example
+    -------
+    >>> write_new_r2c('MESH_parameters_new.r2c', header, ordered_attrs, data, fmt='%.5f')
     """
-    with open(new_file_path, 'w') as out:
-        # write non-attribute header lines
-        for key, val in header_info.items():
-            if not key.startswith(':Attribute'):
-                out.write(f"{key} {val}\n")
-        # write attribute metadata
-        for attr_id, meta in ordered_attributes.items():
-            out.write(f":AttributeName {attr_id} {meta['name']}\n")
-            if meta.get('type'):
-                out.write(f":AttributeType {attr_id} {meta['type']}\n")
-            if meta.get('units'):
-                out.write(f":AttributeUnits {attr_id} {meta['units']}\n")
-        out.write(":EndHeader\n")
+    with open(new_file_path, 'w', buffering=R2C_WRITE_BUFFER_SIZE) as out:
+        _write_r2c_header(out, header_info, ordered_attributes)
         # write grid rows for each attribute
         for attr_id, meta in ordered_attributes.items():
             name = meta['name']
             if name not in attribute_data:
                 raise KeyError(f"Missing data for attribute '{name}'")
-            grid = attribute_data[name]
-            for row in grid:
-                out.write(" ".join(map(str, row)) + "\n")
+            _write_grid(out, attribute_data[name], fmt)
+
+
+class R2CTimeSeries:
+    """
+    Lazy reader for time-series (``:Frame``/``:EndFrame``) EnSim .r2c files.
+
+    On open the header is parsed and the byte offsets of every frame are
+    indexed in one scan of the memory-mapped file; frame values are only parsed
+    when a frame is accessed. A file without frames is exposed as a single
+    frame holding its static data block.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the .r2c file.
+
+    Attributes
+    ----------
+    header_info : dict[str, str]
+        Header key→value mapping, as returned by ``read_r2c_file``.
+    attributes : dict[int, dict]
+        Attribute ID→metadata mapping, as returned by ``read_r2c_file``.
+    frame_info : list[dict]
+        One dict per frame with keys 'frame', 'step' (ints) and 'time' (str,
+        or None if the ':Frame' line has no time stamp).
+    has_frames : bool
+        Whether the file has ':Frame' blocks (False for static files).
+    shape : tuple[int, int, int, int]
+        (n_frames, n_attributes, n_rows, n_cols).
+
+    Example
+    -------
+    >>> with R2CTimeSeries('MESH_input_forcing.r2c') as ts:
+    ...     first = ts[0]              # (n_attributes, n_rows, n_cols)
+    ...     last_day = ts[-24:]        # (24, n_attributes, n_rows, n_cols)
+    ...     for frame in ts:           # streams one frame at a time
+    ...         pass
+    """
+
+    _FRAME_RE = re.compile(rb'^[ \t]*:(Frame|EndFrame)\b([^\r\n]*)', re.MULTILINE)
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file = open(file_path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files cannot be memory-mapped
+            self._file.close()
+            raise ValueError(f"Empty r2c file: {file_path}")
+
+        with open(file_path, 'r') as f:
+            self.header_info, self.attributes = _read_r2c_header(f)
+        end_header = self._map.find(b':EndHeader')
+        data_start = self._map.find(b'\n', end_header) + 1 or len(self._map)
+
+        self.n_cols = int(self.header_info[':xCount'])
+        self.n_rows = int(self.header_info[':yCount'])
+        self.n_attributes = max(len(self.attributes), 1)
+
+        # index frame data byte ranges
+        self.frame_info = []
+        offsets = []
+        start = None
+        for match in self._FRAME_RE.finditer(self._map, data_start):
+            if match.group(1) == b'Frame':
+                parts = match.group(2).decode().split(None, 2)
+                self.frame_info.append({
+                    'frame': int(parts[0]) if len(parts) > 0 else len(self.frame_info) + 1,
+                    'step':  int(parts[1]) if len(parts) > 1 else len(self.frame_info) + 1,
+                    'time':  parts[2].strip().strip('"') if len(parts) > 2 else None
+                })
+                start = match.end()
+            elif start is not None:
+                offsets.append((start, match.start()))
+                start = None
+        if start is not None:
+            offsets.append((start, len(self._map)))
+        self.has_frames = bool(self.frame_info)
+        if not self.has_frames:
+            self.frame_info.append({'frame': 1, 'step': 1, 'time': None})
+            offsets.append((data_start, len(self._map)))
+        self._offsets = np.array(offsets, dtype=np.int64)
+
+    @property
+    def shape(self):
+        return (len(self._offsets), self.n_attributes, self.n_rows, self.n_cols)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def read_frame(self, index):
+        """
+        Parse one frame.
+
+        Parameters
+        ----------
+        index : int
+            Zero-based frame index (negative values count from the end).
+
+        Returns
+        -------
+        np.ndarray, shape (n_attributes, n_rows, n_cols)
+        """
+        start, end = self._offsets[index]
+        values = np.array(self._map[start:end].split(), dtype=float)
+        expected = self.n_attributes * self.n_rows * self.n_cols
+        if values.size != expected:
+            raise ValueError(f"Frame {index}: expected {expected} values, got {values.size}")
+        return values.reshape((self.n_attributes, self.n_rows, self.n_cols))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            indices = range(*index.indices(len(self)))
+            data = np.empty((len(indices),) + self.shape[1:], dtype=float)
+            for k, i in enumerate(indices):
+                data[k] = self.read_frame(i)
+            return data
+        return self.read_frame(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.read_frame(i)
+
+    def close(self):
+        """Release the memory map and file handle."""
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class R2CTimeSeriesWriter:
+    """
+    Streaming writer for time-series (``:Frame``/``:EndFrame``) EnSim .r2c files.
+
+    The header is written on open and each call to ``write_frame`` appends one
+    frame, so files of any length are written with one frame in memory.
+
+    Parameters
+    ----------
+    file_path : str
+        Path of the .r2c file to write.
+    header_info : dict[str, str]
+        Header key→value mapping (as from ``read_r2c_file``).
+    attributes : dict[int, dict]
+        Attribute ID→metadata dict specifying write order.
+    fmt : str, optional
+        printf-style format of one value (default '%s', full precision).
+
+    Example
+    -------
+    >>> with R2CTimeSeries('forcing.r2c') as src, \\
+    ...      R2CTimeSeriesWriter('forcing_scaled.r2c', src.header_info, src.attributes) as dst:
+    ...     for info, frame in zip(src.frame_info, src):
+    ...         dst.write_frame(frame * 1.1, time=info['time'])
+    """
+
+    def __init__(self, file_path, header_info, attributes, fmt=R2C_WRITE_FORMAT):
+        self.file_path = file_path
+        self.attributes = attributes
+        self.fmt = fmt
+        self.n_frames = 0
+        self._out = open(file_path, 'w', buffering=R2C_WRITE_BUFFER_SIZE)
+        _write_r2c_header(self._out, header_info, attributes)
+
+    def write_frame(self, data, time=None, step=None):
+        """
+        Append one frame.
+
+        Parameters
+        ----------
+        data : np.ndarray, shape (n_attributes, n_rows, n_cols) or (n_rows, n_cols)
+            Grid values of the frame.
+        time : str or datetime, optional
+            Frame time stamp; datetimes are written as 'YYYY/MM/DD HH:MM:SS.000'.
+        step : int, optional
+            Time step number written after the frame number (default: frame number).
+        """
+        data = np.asarray(data)
+        if data.ndim == 2:
+            data = data[np.newaxis]
+        self.n_frames += 1
+        if time is None:
+            time_str = ''
+        elif isinstance(time, str):
+            time_str = f' "{time}"'
+        else:
+            time_str = f' "{time:%Y/%m/%d %H:%M:%S}.000"'
+        self._out.write(f":Frame {self.n_frames} {step or self.n_frames}{time_str}\n")
+        for grid in data:
+            _write_grid(self._out, grid, self.fmt)
+        self._out.write(":EndFrame\n")
+
+    def close(self):
+        """Flush and close the file."""
+        self._out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _write_r2c_header(out, header_info, attributes):
+    """Write the header block of an r2c file to an open text stream."""
+    # write non-attribute header lines
+    for key, val in header_info.items():
+        if not key.startswith(':Attribute'):
+            out.write(f"{key} {val}\n")
+    # write attribute metadata
+    for attr_id, meta in attributes.items():
+        out.write(f":AttributeName {attr_id} {meta['name']}\n")
+        if meta.get('type'):
+            out.write(f":AttributeType {attr_id} {meta['type']}\n")
+        if meta.get('units'):
+            out.write(f":AttributeUnits {attr_id} {meta['units']}\n")
+    out.write(":EndHeader\n")
+
+
+def _write_grid(out, grid, fmt=R2C_WRITE_FORMAT, block_values=2 ** 20):
+    """
+    Write the rows of one 2D grid to an open text stream.
+
+    Rows are formatted in blocks of about ``block_values`` values with one
+    %-format of the whole block instead of one string conversion per value.
+    """
+    grid = np.asarray(grid)
+    n_rows, n_cols = grid.shape
+    row_fmt = ' '.join([fmt] * n_cols) + '\n'
+    rows_per_block = max(1, block_values // max(n_cols, 1))
+    # tolist() widens e.g. float32 to Python floats, whose str() shows the widening noise
+    as_python = grid.dtype == np.float64 or grid.dtype.kind in 'iub'
+    for r0 in range(0, n_rows, rows_per_block):
+        block = grid[r0:r0 + rows_per_block]
+        values = block.ravel().tolist() if as_python else block.ravel()
+        out.write((row_fmt * len(block)) % tuple(values))
 
 
 def clean_attribute_name(name):
@@ -225,20 +684,26 @@ def clean_attribute_name(name):
 
 # ─── PLOTTING FUNCTIONS ──────────────────────────────────────────────────────────
 
+_WORKER_STATE = {}
+
 def plot_diff_panel_geo(
     base_mat, scen_mat,
     header_info, attributes,
     subset_ids, skip_idxs,
-    panel_title, out_file
+    panel_title, out_file,
+    cmap='seismic_r', vmin=-1, vmax=1,
+    boundary=None, show=True
 ):
     """
     Small-multiples of (scen – base) for each attribute in subset_ids.
     """
-    diff_list = [scen_mat[aid-1] - base_mat[aid-1] for aid in subset_ids]
+    idx = np.asarray(subset_ids) - 1
+    diff_stack = np.asarray(scen_mat)[idx] - np.asarray(base_mat)[idx]
     _plot_panel_geo(
-        diff_list, header_info, attributes,
+        diff_stack, header_info, attributes,
         subset_ids, skip_idxs, panel_title, out_file,
-        cmap='seismic_r', vmin=-1, vmax=1
+        cmap=cmap, vmin=vmin, vmax=vmax,
+        boundary=boundary, show=show
     )
 
 
@@ -247,24 +712,154 @@ def plot_r2c_panel_geo(
     header_info, attributes,
     subset_ids, skip_idxs,
     panel_title, out_file,
-    cmap='viridis', vmin=None, vmax=None
+    cmap='viridis', vmin=None, vmax=None,
+    boundary=None, show=True
 ):
     """
     Small-multiples of the raw .r2c layers in mat.
     """
-    arr_list = [mat[aid-1] for aid in subset_ids]
+    arr_stack = np.asarray(mat)[np.asarray(subset_ids) - 1]
     _plot_panel_geo(
-        arr_list, header_info, attributes,
+        arr_stack, header_info, attributes,
         subset_ids, skip_idxs, panel_title, out_file,
-        cmap=cmap, vmin=vmin, vmax=vmax
+        cmap=cmap, vmin=vmin, vmax=vmax,
+        boundary=boundary, show=show
     )
 
 
+def plot_panel_figures(
+    mat, header_info, attributes, figures,
+    base_mat=None, boundary=None, workers=1,
+    **plot_kwargs
+):
+    """
+    Render several small-multiples figures, optionally across a process pool.
+
+    Each worker receives the data matrices and loads the boundary overlay once,
+    then renders its figures off-screen and saves them to file.
+
+    Parameters
+    ----------
+    mat : np.ndarray, shape (n_attributes, n_rows, n_cols)
+        Data matrix (the scenario matrix when ``base_mat`` is given).
+    header_info : dict[str, str]
+        Header key→value mapping (as from read_r2c_file).
+    attributes : dict[int, dict]
+        Attribute ID→metadata mapping (as from read_r2c_file).
+    figures : list of tuple
+        One (subset_ids, skip_idxs, panel_title, out_file) tuple per figure,
+        e.g. one per GRU subset.
+    base_mat : np.ndarray, optional
+        Baseline matrix. If given, (mat – base_mat) differences are plotted
+        as in ``plot_diff_panel_geo``; otherwise raw layers as in
+        ``plot_r2c_panel_geo``.
+    boundary : str or geopandas.GeoDataFrame or None, optional
+        Boundary overlay (path or layer); None draws no overlay.
+    workers : int, optional
+        Number of worker processes (default 1 renders serially).
+    **plot_kwargs
+        cmap, vmin and vmax passed to ``plot_diff_panel_geo`` or
+        ``plot_r2c_panel_geo``.
+
+    Returns
+    -------
+    list of str
+        The written figure paths, in the order of ``figures``.
+
+    Example
+    -------
+    >>> figures = [([1, 2, 3], [], 'Forest GRUs', 'forest.png'),
+    ...            ([4, 5, 6], [], 'Crop GRUs', 'crop.png')]
+    >>> plot_panel_figures(scen, header, attrs, figures, base_mat=base,
+    ...                    boundary='basin.shp', workers=4)
+    """
+    if isinstance(boundary, str):
+        boundary = _read_boundary(boundary)
+
+    if workers <= 1:
+        _init_plot_worker(mat, base_mat, header_info, attributes, boundary, plot_kwargs, backend=None)
+        try:
+            return [_plot_figure(*fig) for fig in figures]
+        finally:
+            _WORKER_STATE.clear()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_plot_worker,
+                             initargs=(mat, base_mat, header_info, attributes, boundary, plot_kwargs)) as pool:
+        futures = [pool.submit(_plot_figure, *fig) for fig in figures]
+        return [future.result() for future in futures]
+
+
+def _init_plot_worker(mat, base_mat, header_info, attributes, boundary, plot_kwargs, backend='Agg'):
+    """Store the shared inputs of ``plot_panel_figures`` in the worker process."""
+    # pool workers render off-screen; the serial path keeps the caller's backend
+    if backend is not None:
+        matplotlib.use(backend)
+    _WORKER_STATE.update(mat=mat, base_mat=base_mat, header_info=header_info,
+                         attributes=attributes, boundary=boundary, plot_kwargs=plot_kwargs)
+
+
+def _plot_figure(subset_ids, skip_idxs, panel_title, out_file):
+    """Render one figure of ``plot_panel_figures`` from the worker state."""
+    state = _WORKER_STATE
+    if state['base_mat'] is not None:
+        plot_diff_panel_geo(state['base_mat'], state['mat'], state['header_info'], state['attributes'],
+                            subset_ids, skip_idxs, panel_title, out_file,
+                            boundary=state['boundary'], show=False, **state['plot_kwargs'])
+    else:
+        plot_r2c_panel_geo(state['mat'], state['header_info'], state['attributes'],
+                           subset_ids, skip_idxs, panel_title, out_file,
+                           boundary=state['boundary'], show=False, **state['plot_kwargs'])
+    print(f"Saved {out_file}")
+    return out_file
+
+
+@lru_cache(maxsize=8)
+def _read_boundary(path):
+    """Read a boundary layer once per process."""
+    return gpd.read_file(path)
+
+
+def _panel_statistics(stack):
+    """
+    Box-plot statistics of every panel in one vectorized pass.
+
+    Zero and NaN cells are excluded. Returns a list with, per panel, either a
+    ``matplotlib`` ``bxp`` stats dict (whiskers at 1.5 IQR, as ``boxplot``)
+    extended with 'p1'/'p99' percentiles, or None when the panel has no values.
+    """
+    vals = np.where(stack == 0, np.nan, stack).reshape(len(stack), -1)
+    valid = ~np.isnan(vals)
+    counts = valid.sum(axis=1)
+
+    stats = [None] * len(stack)
+    has_data = counts > 0
+    if not has_data.any():
+        return stats
+    v = vals[has_data]
+    p1, q1, med, q3, p99 = np.nanpercentile(v, [1, 25, 50, 75, 99], axis=1)
+    iqr = q3 - q1
+    lo_lim = (q1 - 1.5 * iqr)[:, None]
+    hi_lim = (q3 + 1.5 * iqr)[:, None]
+    whislo = np.nanmin(np.where(v >= lo_lim, v, np.nan), axis=1)
+    whishi = np.nanmax(np.where(v <= hi_lim, v, np.nan), axis=1)
+    fliers = (v < lo_lim) | (v > hi_lim)
+
+    for k, i in enumerate(np.flatnonzero(has_data)):
+        stats[i] = {
+            'med': med[k], 'q1': q1[k], 'q3': q3[k],
+            'whislo': whislo[k], 'whishi': whishi[k],
+            'fliers': v[k][fliers[k]],
+            'p1': p1[k], 'p99': p99[k]
+        }
+    return stats
+
+
 def _plot_panel_geo(
-    arr_list, header_info, attributes,
+    arr_stack, header_info, attributes,
     subset_ids, skip_idxs,
     panel_title, out_file,
-    cmap, vmin, vmax
+    cmap, vmin, vmax,
+    boundary=None, show=True
 ):
     """
     Core routine for both absolute and difference panels.
@@ -282,32 +877,34 @@ def _plot_panel_geo(
     lon_edges = np.r_[lons - dx/2, lons[-1] + dx/2]
     lat_edges = np.r_[lats - dy/2, lats[-1] + dy/2]
 
-    # shapefile (SRB sub-drainages)
-    shp = gpd.read_file('/home/fuaday/matlablaptop/SRBshape/SaskRB_SubDrainage2.shp')
+    # boundary overlay (e.g. SRB sub-drainages), read once per process
+    if isinstance(boundary, str):
+        boundary = _read_boundary(boundary)
+    boundary_lines = boundary.boundary if boundary is not None else None
 
     # build panels
     titles = [clean_attribute_name(attributes[aid]['name']) for aid in subset_ids]
-    panels = [
-        (t,a)
-        for idx,(t,a) in enumerate(zip(titles,arr_list))
-        if idx not in skip_idxs
-    ]
+    keep = [idx for idx in range(len(titles)) if idx not in skip_idxs]
+    titles = [titles[idx] for idx in keep]
+    arr_stack = np.asarray(arr_stack, dtype=float)[keep]
+    stats = _panel_statistics(arr_stack)
 
-    n    = len(panels)
+    n    = len(titles)
     cols = 3
     rows = ceil(n/cols)
     fig,axes = plt.subplots(rows,cols,
                            figsize=(2.5*cols, 2.3*rows),
                            constrained_layout=True,
                            facecolor='white')
-    axes = axes.flatten()
+    axes = np.atleast_1d(axes).flatten()
 
-    for ax,(title,arr) in zip(axes, panels):
+    for ax,title,arr,st in zip(axes, titles, arr_stack, stats):
         arrp = np.where(arr==0, np.nan, arr)
         mesh = ax.pcolormesh(lon_edges, lat_edges, arrp,
                              cmap=cmap, vmin=vmin, vmax=vmax,
                              shading='auto')
-        shp.boundary.plot(ax=ax, edgecolor='black', linewidth=0.2)
+        if boundary_lines is not None:
+            boundary_lines.plot(ax=ax, edgecolor='black', linewidth=0.2)
         ax.set_xlim(lon_edges[0], lon_edges[-1])
         ax.set_ylim(lat_edges[0], lat_edges[-1])
         ax.grid(True, which='major',
@@ -319,15 +916,11 @@ def _plot_panel_geo(
         ax.set_ylabel("Latitude", fontsize=7)
         ax.tick_params(axis='both', labelsize=7)
 
-        # inset boxplot
-        flat = arr.flatten()
-        flat = flat[~np.isnan(flat)]
-        flat = flat[flat!=0]
-
+        # inset boxplot from the precomputed statistics
         inset = ax.inset_axes([0.30, 0.11, 0.65, 0.11])
-        if flat.size:
-            inset.boxplot(
-                flat, vert=False, notch=False, whis=1.5, widths=0.5,
+        if st is not None:
+            inset.bxp(
+                [st], vert=False, widths=0.5,
                 patch_artist=True, showcaps=True, showfliers=True,
                 showmeans=False, meanline=False,
                 boxprops=dict(facecolor='lightgray', edgecolor='blue'),
@@ -337,9 +930,8 @@ def _plot_panel_geo(
                 flierprops=dict(marker='+', color='black', alpha=0.6, markersize=3),
                 manage_ticks=True
             )
-            lo,hi = np.percentile(flat,[1,99])
-            inset.set_xlim(lo,hi)
-            q1,q2,q3 = np.percentile(flat,[1,50,99])
+            q1,q2,q3 = st['p1'], st['med'], st['p99']
+            inset.set_xlim(q1,q3)
             inset.set_xticks([q1,q2,q3])
             inset.set_xticklabels([f"{q1:.2f}",f"{q2:.2f}",f"{q3:.2f}"], fontsize=6)
             inset.tick_params(axis='x', pad=1, labelsize=6, colors='blue')
@@ -363,4 +955,6 @@ def _plot_panel_geo(
 
     fig.suptitle(panel_title, fontsize=16, y=1.02)
     fig.savefig(out_file, dpi=300)
-    plt.show()
\ No newline at end of file
+    if show:
+        plt.show()
+    plt.close(fig)
@@ -27,6 +27,17 @@ Example Usage
 ...     default_value=5                    # Default value if no value_column specified
 ... )
 
+Equal-area fractions, with the reprojected layers cached for repeated threshold sweeps:
+>>> from VectorPreProcessing.gdf_edit import EQUAL_AREA_CRS
+>>> for threshold in (0.05, 0.1, 0.2):
+...     flagged_gdf = flag_ncaalg_from_files(
+...         'path/to/shapefile1.shp',
+...         'path/to/shapefile2.shp',
+...         threshold=threshold,
+...         crs=EQUAL_AREA_CRS,
+...         cache_dir='path/to/layer_cache'
+...     )
+
 2. Using GeoDataFrames Directly:
 >>> from VectorPreProcessing.gdf_edit import flag_ncaalg
 >>> import geopandas as gpd
@@ -44,8 +55,21 @@ Example Usage
 ...     default_value=5                    # Default value if no value_column specified
 ... )
 """
+import os
+import json
+import hashlib
 import geopandas as gpd
 import pandas as pd
+import numpy as np
+import shapely
+import pyproj
+from concurrent.futures import ProcessPoolExecutor
+
+# Equal-area CRS for area fractions of continental layers (WGS 84 / NSIDC EASE-Grid 2.0 Global)
+EQUAL_AREA_CRS = "EPSG:6933"
+
+# Per-process state of the tiled workers (set by the pool initializer)
+_WORKER_STATE = {}
 
 def flag_ncaalg(
     gdf1: gpd.GeoDataFrame,
@@ -55,7 +79,10 @@ def flag_ncaalg(
     ncontr_col: str = "ncontr",  # User-defined column name for flag in gdf1
     value_column: str = None,    # Optional column in gdf2 for dynamic values
     initial_value=None,          # Initial value for the ncontr_col in gdf1
-    default_value=2              # Default value for intersections if value_column is None
+    default_value=2,             # Default value for intersections if value_column is None
+    method: str = "bulk",        # "bulk" (vectorized overlay) or "loop" (row by row)
+    tile_size: float = None,     # Tile edge length (gdf1 CRS units) for tiled bulk processing
+    workers: int = 1             # Number of processes running the tiles
 ) -> gpd.GeoDataFrame:
     """
     Flag intersections and optionally assign values from gdf2.
@@ -83,14 +110,43 @@ def flag_ncaalg(
         The initial value to assign to the ncontr_col column in gdf1 before processing intersections.
     default_value : optional
         The default value to assign to the ncontr_col column if value_column is None (default is 2).
+    method : str, optional
+        "bulk" (default) queries the spatial index with all polygons of gdf1 at once and computes
+        the intersection areas of all candidate pairs in vectorized shapely calls; "loop" processes
+        gdf1 row by row. Both assign the same first match above the threshold.
+    tile_size : float, optional
+        If given (bulk method only), gdf1 is split into square tiles of this size (in gdf1 CRS
+        units, by the centre of each polygon's bounds) and the intersections are computed one
+        tile at a time, bounding the memory of the overlay. Results are identical to untiled runs.
+    workers : int, optional
+        Number of worker processes running the tiles (default 1 runs them serially).
 
     Returns
     -------
     gpd.GeoDataFrame
         The modified gdf1 with assigned values based on intersections.
     """
+    if method not in ("bulk", "loop"):
+        raise ValueError(f"Unknown method '{method}', expected 'bulk' or 'loop'")
+    if tile_size and method != "bulk":
+        raise ValueError("tile_size requires method='bulk'")
+
     # Initialize the target column with initial_value in gdf1
     gdf1[ncontr_col] = initial_value
+
+    if method == "bulk":
+        geoms1 = np.asarray(gdf1.geometry.values)
+        geoms2 = np.asarray(gdf2.geometry.values)
+        idx1, idx2 = _candidate_pairs(geoms1, gdf2)
+        if tile_size:
+            rows, matches = _tiled_first_matches(geoms1, geoms2, idx1, idx2, threshold, tile_size, workers)
+        else:
+            rows, matches = _first_matches(geoms1, geoms2, idx1, idx2, threshold)
+        values = gdf2[value_column].to_numpy()[matches] if value_column else None
+        _assign_matches(gdf1, ncontr_col, rows, values, default_value)
+        if output_path is not None:
+            gdf1.to_file(output_path)
+        return gdf1
     
     # Create spatial index for gdf2
     spatial_index = gdf2.sindex
@@ -121,6 +177,252 @@ def flag_ncaalg(
     
     return gdf1
 
+def _candidate_pairs(geoms1, gdf2):
+    """
+    Return the (geoms1 position, gdf2 position) pairs of intersecting geometries.
+
+    The spatial index is queried with predicate='intersects', which tests the exact geometries
+    (not only their bounding boxes), so pairs that merely share a bounding box are excluded.
+
+    The pairs are grouped by geoms1 position, keeping the order returned by the spatial index
+    within each polygon, which is the candidate order of the row-by-row loop of `flag_ncaalg`.
+    """
+    idx1, idx2 = gdf2.sindex.query(geoms1, predicate='intersects')
+    order = np.argsort(idx1, kind='stable')
+    return idx1[order], idx2[order]
+
+def _first_matches(geoms1, geoms2, idx1, idx2, threshold):
+    """
+    Pick, for every polygon of geoms1, the first candidate covering more than `threshold` of its area.
+
+    Parameters
+    ----------
+    geoms1, geoms2 : np.ndarray of shapely geometries
+        The polygons to flag and the candidate polygons.
+    idx1, idx2 : np.ndarray
+        Candidate pairs (positions in geoms1 and geoms2), in candidate order per polygon.
+    threshold : float
+        Minimum (exclusive) fraction of the polygon area covered by the intersection.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        Positions in geoms1 that have a match and the position in geoms2 of their match.
+    """
+    pair_geoms = geoms1[idx1]
+    intersection_area = shapely.area(shapely.intersection(pair_geoms, geoms2[idx2]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        area_fraction = intersection_area / shapely.area(pair_geoms)
+    qualifies = area_fraction > threshold
+
+    # first qualifying candidate per polygon
+    qualifying = pd.DataFrame({'row': idx1[qualifies], 'match': idx2[qualifies]})
+    first = qualifying.groupby('row', sort=True)['match'].first()
+    return first.index.to_numpy(), first.to_numpy()
+
+def _tile_groups(geoms, tile_size):
+    """Split geometry positions into square tiles of `tile_size` by the centre of their bounds."""
+    bounds = shapely.bounds(geoms)
+    cx = (bounds[:, 0] + bounds[:, 2]) / 2
+    cy = (bounds[:, 1] + bounds[:, 3]) / 2
+    positions = np.flatnonzero(~np.isnan(cx))  # missing/empty geometries intersect nothing
+    if len(positions) == 0:
+        return []
+    cx, cy = cx[positions], cy[positions]
+    keys = np.column_stack((np.floor((cx - cx.min()) / tile_size), np.floor((cy - cy.min()) / tile_size)))
+    _, tile = np.unique(keys, axis=0, return_inverse=True)
+    tile = tile.ravel()
+    order = np.argsort(tile, kind='stable')
+    return np.split(positions[order], np.flatnonzero(np.diff(tile[order])) + 1)
+
+def _tiled_first_matches(geoms1, geoms2, idx1, idx2, threshold, tile_size, workers):
+    """Run `_first_matches` tile by tile (optionally in worker processes) and merge the results."""
+    tiles = _tile_groups(geoms1, tile_size)
+    tile_of = np.full(len(geoms1), -1)
+    for t, members in enumerate(tiles):
+        tile_of[members] = t
+    pair_tile = tile_of[idx1]
+    order = np.argsort(pair_tile, kind='stable')  # keeps the candidate order within each polygon
+    pair_tile, idx1, idx2 = pair_tile[order], idx1[order], idx2[order]
+    bounds = np.searchsorted(pair_tile, np.arange(len(tiles) + 1))
+
+    # each task holds only the geometries of one tile and of its candidates, with local positions
+    tasks = []
+    for t, members in enumerate(tiles):
+        t_idx1, t_idx2 = idx1[bounds[t]:bounds[t + 1]], idx2[bounds[t]:bounds[t + 1]]
+        if len(t_idx1) == 0:
+            continue
+        needed2 = np.unique(t_idx2)
+        members = np.sort(members)
+        tasks.append((members, needed2, geoms1[members], geoms2[needed2],
+                      np.searchsorted(members, t_idx1), np.searchsorted(needed2, t_idx2)))
+
+    def merge(results):
+        rows, matches = [], []
+        for (members, needed2, *_), (t_rows, t_matches) in zip(tasks, results):
+            rows.append(members[t_rows])
+            matches.append(needed2[t_matches])
+        if not rows:
+            return np.array([], dtype=int), np.array([], dtype=int)
+        rows, matches = np.concatenate(rows), np.concatenate(matches)
+        order = np.argsort(rows)
+        return rows[order], matches[order]
+
+    task_args = [(g1, g2, i1, i2, threshold) for _, _, g1, g2, i1, i2 in tasks]
+    if workers <= 1 or len(tasks) <= 1:
+        return merge([_first_matches(*args) for args in task_args])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return merge(list(pool.map(_first_matches, *zip(*task_args))))
+
+def read_reprojected(path, crs="EPSG:4326", cache_dir=None, make_valid=False):
+    """
+    Read a vector layer reprojected to `crs`, optionally with invalid geometries repaired.
+
+    With a `cache_dir` the result is stored there as GeoParquet, keyed by the source file (path,
+    size and modification time of the file and its shapefile sidecars), the CRS and `make_valid`,
+    and later calls read the cache instead of re-reading and re-projecting the source.
+
+    Parameters
+    ----------
+    path : str
+        Path to the vector file (e.g. a shapefile).
+    crs : optional
+        Target CRS (anything accepted by `pyproj.CRS`).
+    cache_dir : str, optional
+        Directory of the GeoParquet caches (created if missing).
+    make_valid : bool, optional
+        Repair invalid geometries with `shapely.make_valid` after reprojection (default False).
+
+    Returns
+    -------
+    gpd.GeoDataFrame
+
+    Example
+    -------
+    >>> basins = read_reprojected('path/to/shapefile1.shp', EQUAL_AREA_CRS, cache_dir='layer_cache')
+    """
+    if cache_dir is None:
+        gdf = gpd.read_file(path).to_crs(crs)
+        return _make_valid(gdf) if make_valid else gdf
+    gdf = gpd.read_parquet(_cached_layer(path, crs, cache_dir, make_valid))
+    return gdf.reset_index(drop=True)
+
+def _cached_layer(path, crs, cache_dir, make_valid=False):
+    """Return the GeoParquet cache of `path` reprojected to `crs`, writing it if missing or stale."""
+    crs_text = pyproj.CRS(crs).to_wkt()
+    stats = []
+    stem = os.path.splitext(path)[0]
+    for source in [path] + [stem + ext for ext in ('.shx', '.dbf', '.prj', '.cpg')]:
+        if os.path.exists(source):
+            st = os.stat(source)
+            stats.append([os.path.abspath(source), st.st_size, st.st_mtime_ns])
+    key = hashlib.sha1(json.dumps([stats, crs_text, bool(make_valid)]).encode()).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f"{os.path.basename(stem)}.{key}.parquet")
+    if not os.path.exists(cache_path):
+        os.makedirs(cache_dir, exist_ok=True)
+        gdf = gpd.read_file(path).to_crs(crs)
+        if make_valid:
+            gdf = _make_valid(gdf)
+        # keep the feature order as a stored index, so bbox reads of the cache retain it
+        gdf.index = pd.Index(np.arange(len(gdf)), name='fid')
+        part_path = cache_path + '.part'
+        gdf.to_parquet(part_path, write_covering_bbox=True)
+        os.replace(part_path, cache_path)
+    return cache_path
+
+def _make_valid(gdf):
+    """Repair invalid geometries in place with `shapely.make_valid` and return gdf."""
+    geoms = np.asarray(gdf.geometry.values)
+    invalid = ~shapely.is_valid(geoms) & ~shapely.is_missing(geoms)
+    if invalid.any():
+        geoms = geoms.copy()
+        geoms[invalid] = shapely.make_valid(geoms[invalid])
+        gdf[gdf.geometry.name] = gpd.GeoSeries(geoms, index=gdf.index, crs=gdf.crs)
+    return gdf
+
+def _assign_matches(gdf1, ncontr_col, rows, values, default_value):
+    """Set ncontr_col of the matched rows to `values`, or to `default_value` if values is None."""
+    if len(rows):
+        gdf1.iloc[rows, gdf1.columns.get_loc(ncontr_col)] = (
+            values if values is not None else [default_value] * len(rows))
+
+def _tiled_file_matches(geoms1, crs, shapefile2, threshold, value_column, tile_size, workers, cache_dir=None,
+                        make_valid=False):
+    """
+    Match geoms1 tile by tile against the features of shapefile2 read with per-tile bbox filters.
+
+    With a `cache_dir` the tiles are read from the GeoParquet cache of shapefile2 in `crs`
+    (built on first use), otherwise from shapefile2 itself with pyogrio.
+
+    Returns the matched positions in geoms1 and their values of `value_column` (None without one).
+    """
+    import pyogrio
+
+    tiles = _tile_groups(geoms1, tile_size)
+    if cache_dir is not None:
+        source = _cached_layer(shapefile2, crs, cache_dir, make_valid)
+        source_crs = crs
+    else:
+        source = shapefile2
+        source_crs = pyogrio.read_info(shapefile2)['crs']
+    transformer = None
+    if source_crs is not None and not pyproj.CRS(source_crs).equals(crs):
+        transformer = pyproj.Transformer.from_crs(crs, source_crs, always_xy=True)
+    tasks = []
+    for members in tiles:
+        bbox = tuple(shapely.total_bounds(geoms1[members]))
+        if transformer is not None:
+            bbox = transformer.transform_bounds(*bbox, densify_pts=21)
+        tasks.append((geoms1[members], bbox))
+
+    initargs = (source, crs, threshold, value_column, make_valid)
+    if workers <= 1 or len(tasks) <= 1:
+        _init_tile_worker(*initargs)
+        try:
+            results = [_flag_file_tile(*task) for task in tasks]
+        finally:
+            _WORKER_STATE.clear()
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_tile_worker, initargs=initargs) as pool:
+            results = list(pool.map(_flag_file_tile, *zip(*tasks)))
+
+    rows = [members[t_rows] for members, (t_rows, _) in zip(tiles, results)]
+    rows = np.concatenate(rows) if rows else np.array([], dtype=int)
+    values = None
+    if value_column and len(rows):
+        values = np.concatenate([t_values for _, t_values in results])
+    return rows, values
+
+def _init_tile_worker(source, crs, threshold, value_column, make_valid=False):
+    """Store the settings of the tiled file overlay once per worker process."""
+    _WORKER_STATE.clear()
+    _WORKER_STATE.update(source=source, crs=crs, threshold=threshold, value_column=value_column,
+                         make_valid=make_valid)
+
+def _flag_file_tile(geoms1, bbox):
+    """Read the features of the second layer within `bbox` and match the polygons of one tile."""
+    import pyogrio
+
+    state = _WORKER_STATE
+    value_column = state['value_column']
+    columns = [value_column] if value_column else []
+    if state['source'].endswith('.parquet'):
+        # cached layer: already reprojected (and repaired), index holds the feature order
+        gdf2 = gpd.read_parquet(state['source'], bbox=bbox, columns=columns + ['geometry'])
+    else:
+        gdf2 = pyogrio.read_dataframe(state['source'], bbox=bbox, fid_as_index=True, columns=columns)
+        if gdf2.crs is not None:
+            gdf2 = gdf2.to_crs(state['crs'])
+        if state['make_valid']:
+            gdf2 = _make_valid(gdf2)
+    idx1, idx2 = gdf2.sindex.query(geoms1, predicate='intersects')
+    # candidates in file order within each polygon
+    order = np.lexsort((gdf2.index.to_numpy()[idx2], idx1))
+    rows, matches = _first_matches(geoms1, np.asarray(gdf2.geometry.values), idx1[order], idx2[order],
+                                   state['threshold'])
+    values = gdf2[value_column].to_numpy()[matches] if value_column else None
+    return rows, values
+
 def flag_ncaalg_from_files(
     shapefile1: str,
     shapefile2: str,
@@ -129,10 +431,19 @@ def flag_ncaalg_from_files(
     ncontr_col: str = "ncontr",  # User-defined column name for flag in gdf1
     value_column: str = None,    # Optional column in gdf2 for dynamic values
     initial_value=None,          # Initial value for the ncontr_col in gdf1
-    default_value=2              # Default value for intersections if value_column is None
+    default_value=2,             # Default value for intersections if value_column is None
+    method: str = "bulk",        # "bulk" (vectorized overlay) or "loop" (row by row)
+    tile_size: float = None,     # Tile edge length (crs units) for tiled processing
+    workers: int = 1,            # Number of processes running the tiles
+    crs="EPSG:4326",             # CRS of the overlay (e.g. EQUAL_AREA_CRS for equal-area fractions)
+    cache_dir: str = None,       # Directory of GeoParquet caches of the reprojected layers
+    make_valid: bool = False     # Repair invalid geometries after reprojection
 ) -> gpd.GeoDataFrame:
     """
-    Read two shapefiles, set their CRS to EPSG:4326, and apply the `flag_ncaalg` function.
+    Read two shapefiles, reproject them to `crs` (EPSG:4326 by default), and apply the `flag_ncaalg` function.
+
+    With `make_valid=True`, invalid geometries are repaired with `shapely.make_valid` after
+    reprojection.
 
     Parameters
     ----------
@@ -153,22 +464,54 @@ def flag_ncaalg_from_files(
         The initial value to assign to the ncontr_col column in gdf1 before processing intersections.
     default_value : optional
         The default value to assign to the ncontr_col column if value_column is None (default is 2).
+    method : str, optional
+        "bulk" (default) or "loop"; see `flag_ncaalg`.
+    tile_size : float, optional
+        If given (bulk method only), the first layer is split into square tiles of this size in
+        units of `crs` and, per tile, only the features of the second layer inside the tile's
+        bounding box are read (pyogrio or GeoParquet bbox reads), so the second layer is never
+        loaded as a whole. When several features qualify for a polygon, the first one in file
+        order is used: the spatial-index order that untiled runs follow cannot be reproduced
+        across per-tile reads, so such polygons can get a different value than in untiled runs
+        (results are otherwise identical).
+    workers : int, optional
+        Number of worker processes running the tiles (default 1 runs them serially).
+    crs : optional
+        CRS the layers are reprojected to and the area fractions computed in. Area fractions in
+        EPSG:4326 are ratios of degree² areas, which are distorted with latitude; use an equal-area
+        projection such as `EQUAL_AREA_CRS` for true area fractions. The returned layer is in `crs`.
+    cache_dir : str, optional
+        If given, the reprojected and validated layers are cached there as GeoParquet files keyed by
+        source file and CRS, and reused by later calls (e.g. threshold sweeps) while the source files
+        are unchanged. See `read_reprojected`.
+    make_valid : bool, optional
+        Repair invalid geometries of both layers with `shapely.make_valid` (default False keeps
+        them as read).
 
     Returns
     -------
     gpd.GeoDataFrame
         The modified GeoDataFrame of the first GeoDataFrame with the specified column added.
     """
-    # Read the shapefiles into GeoDataFrames
-    gdf1 = gpd.read_file(shapefile1)
-    gdf2 = gpd.read_file(shapefile2)
+    if tile_size:
+        if method != "bulk":
+            raise ValueError("tile_size requires method='bulk'")
+        gdf1 = read_reprojected(shapefile1, crs, cache_dir, make_valid)
+        gdf1[ncontr_col] = initial_value
+        rows, values = _tiled_file_matches(np.asarray(gdf1.geometry.values), gdf1.crs, shapefile2,
+                                           threshold, value_column, tile_size, workers, cache_dir, make_valid)
+        _assign_matches(gdf1, ncontr_col, rows, values, default_value)
+        if output_path is not None:
+            gdf1.to_file(output_path)
+        return gdf1
 
-    # Set the CRS to EPSG:4326 in place
-    gdf1.to_crs(epsg=4326, inplace=True)
-    gdf2.to_crs(epsg=4326, inplace=True)
+    # Read the shapefiles reprojected to crs (from the cache when available)
+    gdf1 = read_reprojected(shapefile1, crs, cache_dir, make_valid)
+    gdf2 = read_reprojected(shapefile2, crs, cache_dir, make_valid)
 
     # Call the original flag_ncaalg function with the specified column name, value column, initial value, and default value
-    return flag_ncaalg(gdf1, gdf2, threshold, output_path, ncontr_col, value_column, initial_value, default_value)
+    return flag_ncaalg(gdf1, gdf2, threshold, output_path, ncontr_col, value_column, initial_value, default_value,
+                       method)
 
 # Examples:
 
@@ -1,15 +1,89 @@
 import os
+import json
+import time
 import argparse
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
+import netCDF4
 import xarray as xs
 import geopandas as gpd
+import shapely
+from scipy import sparse
 import glob
+from datetime import datetime
 from natsort import natsorted
 
-def remap_rdrs_climate_data(input_directory, output_directory, input_basin, input_ddb, start_year, end_year):
+# Number of time steps per storage chunk of the remapped forcing variables
+DEFAULT_TIME_CHUNKSIZE = 24
+
+# Default variable specification: the seven RDRS v2.1 forcing variables, copied
+# unchanged in their input dtype. See load_variable_spec for the available options.
+RDRS_V21_VARIABLES = {
+    'RDRS_v2.1_A_PR0_SFC': {},
+    'RDRS_v2.1_P_P0_SFC': {},
+    'RDRS_v2.1_P_HU_09944': {},
+    'RDRS_v2.1_P_TT_09944': {},
+    'RDRS_v2.1_P_FB_SFC': {},
+    'RDRS_v2.1_P_FI_SFC': {},
+    'RDRS_v2.1_P_UVC_09944': {},
+}
+
+# Options accepted for each variable of a variable specification, with defaults
+_VARIABLE_OPTION_DEFAULTS = {
+    'name': None,          # output variable name (default: input name)
+    'multiply': 1.0,       # unit conversion: output = input * multiply + add
+    'add': 0.0,
+    'units': None,         # output 'units' attribute (default: input units)
+    'attrs': None,         # extra attributes for the output variable
+    'dtype': None,         # output dtype, e.g. 'f8', 'f4', 'i2' (default: input dtype)
+    'scale_factor': None,  # packing parameters for integer dtypes
+    'add_offset': None,
+    'fill_value': None,    # default: NaN for floats, netCDF default for integers
+    'zlib': True,
+    'complevel': 6,
+    'shuffle': True,
+    'chunksizes': None,    # (time, subbasin); None entries mean the full dimension
+}
+
+# Name of the completed-output manifest written to the output directory
+MANIFEST_NAME = 'remap_manifest.json'
+
+# Default file name of the area weights saved in the output directory
+AREA_WEIGHTS_NAME = 'area_weights.npz'
+
+# Per-process state filled by _init_worker: drainage database arrays and the
+# COMID index cache, loaded once per worker rather than once per file
+_WORKER_STATE = {}
+
+def remap_rdrs_climate_data(input_directory, output_directory, input_basin, input_ddb, start_year, end_year,
+                            workers=1, retries=0, time_chunk=None, output_mode='per_file',
+                            output_prefix='remapped_forcing', variable_spec=None, resume=False,
+                            verify_checksums=False, remap_method='comid', weights_file=None,
+                            id_column='COMID', grid_lon='lon', grid_lat='lat'):
     """
     Remap RDRS climate data to a drainage database (DDB) format for a range of years.
 
+    By default every input file produces its own ``*_modified.nc`` output. With
+    ``output_mode='yearly'`` or ``output_mode='merged'`` the input files are
+    instead appended, in natural sort order, to one continuous forcing file per
+    year or to a single file for the whole period, in the same pass that remaps
+    them.
+
+    Every output is written under a temporary ``.part`` name and renamed once it
+    is complete, and is then recorded in a manifest (``MANIFEST_NAME`` in the
+    output directory) with the size and modification time of its inputs, its
+    own size and SHA-256 checksum, and its status. With ``resume=True``, outputs
+    that the manifest records as complete for unchanged inputs, drainage
+    database and settings are skipped, so an interrupted run continues where it stopped.
+
+    With ``remap_method='comid'`` (default) the input files must already hold one
+    column per COMID. With ``remap_method='area_weighted'`` the inputs are
+    gridded forcings: the basin polygons are intersected with the forcing grid
+    cells once (see ``build_area_weights``), the overlap fractions are saved as a
+    sparse matrix in ``weights_file``, and every time step is remapped with one
+    sparse matrix product.
+
     Parameters
     ----------
     input_directory : str
@@ -24,6 +98,57 @@ def remap_rdrs_climate_data(input_directory, output_directory, input_basin, inpu
         Start year of the data to process.
     end_year : int
         End year of the data to process.
+    workers : int, optional
+        Number of worker processes. With 1 (default) files are processed in the
+        current process; with more, files are distributed over a process pool and
+        each worker loads the drainage database and COMID index once.
+    retries : int, optional
+        Number of times a failed file is retried before it is reported as failed
+        (default is 0).
+    time_chunk : int, optional
+        Number of time steps read and written at a time by ``process_file``. If
+        None (default), each file is processed in one piece.
+    output_mode : {'per_file', 'yearly', 'merged'}, optional
+        'per_file' (default) writes one output per input file, 'yearly' writes
+        ``<output_prefix>_<year>.nc`` per year and 'merged' writes
+        ``<output_prefix>_<start_year>_<end_year>.nc`` for the whole period.
+    output_prefix : str, optional
+        File name prefix of the 'yearly' and 'merged' outputs
+        (default is 'remapped_forcing').
+    variable_spec : dict or str, optional
+        Variables to remap with their renames, unit conversions, dtype and
+        compression settings, as a dict or a path to a YAML/JSON file. See
+        ``load_variable_spec``. Default is the seven RDRS v2.1 variables.
+    resume : bool, optional
+        Skip outputs recorded as complete in the manifest (default is False).
+    verify_checksums : bool, optional
+        When resuming, also recompute the SHA-256 checksum of each recorded
+        output instead of only checking that its size matches (default is False).
+    remap_method : {'comid', 'area_weighted'}, optional
+        How forcing data are mapped to subbasins (default is 'comid').
+    weights_file : str, optional
+        Sparse area weights (.npz) for 'area_weighted'. Built from the basin
+        shapefile and the first forcing file if it does not exist. Default is
+        ``AREA_WEIGHTS_NAME`` in the output directory.
+    id_column : str, optional
+        Column of the basin shapefile holding the subbasin IDs (default is 'COMID').
+    grid_lon, grid_lat : str, optional
+        Names of the longitude and latitude variables of gridded forcing files
+        (default is 'lon' and 'lat').
+
+    Returns
+    -------
+    list of dict
+        One entry per output file with keys 'output', 'inputs', 'status'
+        ('done', 'skipped' or 'failed'), 'attempts', 'seconds' and 'error'.
+
+    Raises
+    ------
+    ValueError
+        If ``output_mode`` or ``remap_method`` is not one of the supported modes.
+    RuntimeError
+        If any output still fails after its retries. All other outputs are
+        processed before the error is raised.
 
     Example
     -------
@@ -34,19 +159,25 @@ def remap_rdrs_climate_data(input_directory, output_directory, input_basin, inpu
     ...     input_basin="path/to/basin.shp",
     ...     input_ddb="path/to/ddb.nc",
     ...     start_year=2000,
-    ...     end_year=2020
+    ...     end_year=2020,
+    ...     workers=8,
+    ...     retries=2,
+    ...     time_chunk=744,
+    ...     output_mode="yearly",
+    ...     resume=True
     ... )
     """
-    
+    if output_mode not in ('per_file', 'yearly', 'merged'):
+        raise ValueError(f"output_mode must be 'per_file', 'yearly' or 'merged', got {output_mode!r}")
+    if remap_method not in ('comid', 'area_weighted'):
+        raise ValueError(f"remap_method must be 'comid' or 'area_weighted', got {remap_method!r}")
+    variable_spec = load_variable_spec(variable_spec)
+
     os.makedirs(output_directory, exist_ok=True)
 
     # Read basin and drainage database files
     basin = gpd.read_file(input_basin)
-    db = xs.open_dataset(input_ddb)
-    lon = db.variables['lon'].values
-    lat = db.variables['lat'].values
-    segid = db.variables['subbasin'].values
-    db.close()
+    segid, lon, lat = _load_ddb(input_ddb)
 
     print("Basin Info:")
     print(basin.head())
@@ -56,21 +187,211 @@ def remap_rdrs_climate_data(input_directory, output_directory, input_basin, inpu
 
     # List files based on year range
     files = []
+    files_by_year = {}
     for year in range(start_year, end_year + 1):
         year_files = glob.glob(os.path.join(input_directory, f"*_{str(year)}*.nc"))
         files.extend(year_files)
+        files_by_year[year] = natsorted(year_files)
         print(f"Files for year {year}: {year_files}")
 
     # Sort files in natural order
     files = natsorted(files)
     print("Sorted files:", files)
 
-    # Process each file
-    for file_path in files:
-        print(f"Processing file: {file_path}")
-        process_file(file_path, segid, lon, lat, output_directory)
+    # Group input files into output files
+    if output_mode == 'per_file':
+        tasks = [(_modified_output_path(file_path, output_directory), [file_path]) for file_path in files]
+    elif output_mode == 'yearly':
+        tasks = [(os.path.join(output_directory, f"{output_prefix}_{year}.nc"), year_files)
+                 for year, year_files in files_by_year.items() if year_files]
+    else:
+        tasks = [(os.path.join(output_directory, f"{output_prefix}_{start_year}_{end_year}.nc"), files)] if files else []
+
+    # Intersect the basin polygons with the forcing grid once for the whole run
+    weights = None
+    if remap_method == 'area_weighted':
+        if weights_file is None:
+            weights_file = os.path.join(output_directory, AREA_WEIGHTS_NAME)
+        if not os.path.exists(weights_file) and files:
+            print(f"Building area weights from {files[0]}")
+            sparse.save_npz(weights_file, build_area_weights(files[0], basin, segid, id_column=id_column,
+                                                             grid_lon=grid_lon, grid_lat=grid_lat))
+            print(f"Saved area weights: {weights_file}")
+        if files:
+            weights = sparse.load_npz(weights_file).tocsr()
+
+    # Skip outputs already completed by an earlier run
+    manifest_path = os.path.join(output_directory, MANIFEST_NAME)
+    manifest = _load_manifest(manifest_path)
+    settings = _settings_fingerprint(variable_spec, input_ddb, remap_method,
+                                     weights_file if weights is not None else None)
+    results = []
+    if resume:
+        pending = []
+        for output_path, file_paths in tasks:
+            entry = manifest['outputs'].get(os.path.basename(output_path))
+            if _is_complete(entry, output_path, file_paths, settings, verify_checksums):
+                print(f"Skipping completed output: {output_path}")
+                results.append({'output': output_path, 'inputs': file_paths, 'status': 'skipped',
+                                'attempts': 0, 'seconds': 0.0, 'error': None})
+            else:
+                pending.append((output_path, file_paths))
+        tasks = pending
+
+    # Process each output, reusing the COMID index across files that share
+    # the same forcing grid, and record every finished output in the manifest
+    options = {'time_chunk': time_chunk, 'variable_spec': variable_spec,
+               'grid_lon': grid_lon, 'grid_lat': grid_lat}
+    n_skipped = len(results)
+    t_start = time.time()
+
+    def record(result):
+        results.append(result)
+        _report_progress(result, len(results) - n_skipped, len(tasks), t_start)
+        manifest['outputs'][os.path.basename(result['output'])] = _manifest_entry(result, settings)
+        _write_manifest(manifest_path, manifest)
+
+    if workers <= 1:
+        _WORKER_STATE.update(segid=segid, lon=lon, lat=lat, index_cache={}, weights=weights)
+        for output_path, file_paths in tasks:
+            print(f"Processing output: {output_path}")
+            record(_process_task(output_path, file_paths, retries, options))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(input_ddb, weights_file if weights is not None else None)) as pool:
+            futures = [pool.submit(_process_task, output_path, file_paths, retries, options)
+                       for output_path, file_paths in tasks]
+            for future in as_completed(futures):
+                record(future.result())
+
+    return _summarize_results(results, time.time() - t_start)
+
+def _load_ddb(input_ddb):
+    """Read subbasin IDs, longitudes and latitudes from the drainage database."""
+    db = xs.open_dataset(input_ddb)
+    lon = db.variables['lon'].values
+    lat = db.variables['lat'].values
+    segid = db.variables['subbasin'].values
+    db.close()
+    return segid, lon, lat
+
+def _init_worker(input_ddb, weights_file=None):
+    """Load the drainage database and area weights once per worker process."""
+    segid, lon, lat = _load_ddb(input_ddb)
+    weights = sparse.load_npz(weights_file).tocsr() if weights_file is not None else None
+    _WORKER_STATE.clear()
+    _WORKER_STATE.update(segid=segid, lon=lon, lat=lat, index_cache={}, weights=weights)
+
+def _process_task(output_path, file_paths, retries, options):
+    """Run process_files with the worker state, retrying on failure, and return a status dict."""
+    t0 = time.time()
+    error = None
+    for attempt in range(1, retries + 2):
+        try:
+            process_files(file_paths, output_path, _WORKER_STATE['segid'], _WORKER_STATE['lon'],
+                          _WORKER_STATE['lat'], index_cache=_WORKER_STATE['index_cache'],
+                          weights=_WORKER_STATE['weights'], **options)
+            return {'output': output_path, 'inputs': file_paths, 'status': 'done', 'attempts': attempt,
+                    'seconds': time.time() - t0, 'error': None,
+                    'output_size': os.path.getsize(output_path), 'output_sha256': _sha256(output_path)}
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"Attempt {attempt} of {retries + 1} failed for {output_path}: {error}")
+    return {'output': output_path, 'inputs': file_paths, 'status': 'failed', 'attempts': retries + 1,
+            'seconds': time.time() - t0, 'error': error}
+
+def _report_progress(result, n_done, n_total, t_start):
+    """Print one progress line for a finished output."""
+    elapsed = time.time() - t_start
+    remaining = elapsed / n_done * (n_total - n_done)
+    print(f"[{n_done}/{n_total}] {result['status']}: {os.path.basename(result['output'])} "
+          f"({len(result['inputs'])} input file(s)) in {result['seconds']:.1f}s "
+          f"(elapsed {elapsed:.1f}s, ~{remaining:.1f}s remaining)")
+
+def _summarize_results(results, total_seconds):
+    """Print a timing summary of a run and raise if any output failed."""
+    done = [r for r in results if r['status'] == 'done']
+    skipped = [r for r in results if r['status'] == 'skipped']
+    failed = [r for r in results if r['status'] == 'failed']
+    task_seconds = sum(r['seconds'] for r in results)
+    n_inputs = sum(len(r['inputs']) for r in done)
+    print(f"Wrote {len(done)} of {len(results)} outputs from {n_inputs} input files in {total_seconds:.1f}s "
+          f"(sum of per-output times {task_seconds:.1f}s, {len(skipped)} already complete)")
+    if failed:
+        for r in failed:
+            print(f"Failed: {r['output']} after {r['attempts']} attempt(s): {r['error']}")
+        raise RuntimeError(f"{len(failed)} of {len(results)} outputs failed: "
+                           f"{[r['output'] for r in failed]}")
+    return results
+
+def _file_fingerprint(path):
+    """Return the path, size and modification time identifying an input file."""
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def _settings_fingerprint(variable_spec, input_ddb, remap_method='comid', weights_file=None):
+    """Return a hash of the settings and drainage database that change the content of an output."""
+    settings = {'variable_spec': variable_spec, 'remap_method': remap_method,
+                'ddb': _file_fingerprint(input_ddb)}
+    if weights_file is not None:
+        settings['weights'] = _file_fingerprint(weights_file)
+    text = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+def _sha256(path, block_size=2 ** 20):
+    """Return the SHA-256 checksum of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _load_manifest(manifest_path):
+    """Read the manifest of completed outputs, or return an empty one."""
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    return {'outputs': {}}
+
+def _write_manifest(manifest_path, manifest):
+    """Write the manifest through a temporary file so it is never left half-written."""
+    tmp_path = manifest_path + '.part'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def _manifest_entry(result, settings):
+    """Build the manifest record of a processed output."""
+    return {
+        'output': os.path.abspath(result['output']),
+        'inputs': [_file_fingerprint(path) for path in result['inputs']],
+        'settings': settings,
+        'status': 'complete' if result['status'] == 'done' else 'failed',
+        'output_size': result.get('output_size'),
+        'output_sha256': result.get('output_sha256'),
+        'error': result['error'],
+        'updated': datetime.now().isoformat(timespec='seconds')
+    }
+
+def _is_complete(entry, output_path, file_paths, settings, verify_checksums):
+    """Check whether a manifest entry records a valid output for the current inputs and settings."""
+    if not entry or entry.get('status') != 'complete' or entry.get('settings') != settings:
+        return False
+    if not os.path.exists(output_path) or os.path.getsize(output_path) != entry.get('output_size'):
+        return False
+    try:
+        inputs = [_file_fingerprint(path) for path in file_paths]
+    except OSError:
+        return False
+    if inputs != entry.get('inputs'):
+        return False
+    return not verify_checksums or _sha256(output_path) == entry.get('output_sha256')
 
-def remap_rdrs_climate_data_single_year(input_directory, output_directory, input_basin, input_ddb, year):
+def remap_rdrs_climate_data_single_year(input_directory, output_directory, input_basin, input_ddb, year,
+                                        workers=1, retries=0, time_chunk=None, output_mode='per_file',
+                                        output_prefix='remapped_forcing', variable_spec=None, resume=False,
+                                        verify_checksums=False, remap_method='comid', weights_file=None,
+                                        id_column='COMID', grid_lon='lon', grid_lat='lat'):
     """
     Remap RDRS climate data to a drainage database (DDB) format for a single year.
 
@@ -86,6 +407,35 @@ def remap_rdrs_climate_data_single_year(input_directory, output_directory, input
         Path to the drainage database NetCDF file.
     year : int
         Year of the data to process.
+    workers : int, optional
+        Number of worker processes (default is 1).
+    retries : int, optional
+        Number of retries for a failed file (default is 0).
+    time_chunk : int, optional
+        Number of time steps read and written at a time (default is the whole file).
+    output_mode : {'per_file', 'yearly', 'merged'}, optional
+        Write one output per input file (default) or one continuous file for the year.
+    output_prefix : str, optional
+        File name prefix of the 'yearly' and 'merged' outputs.
+    variable_spec : dict or str, optional
+        Variable specification or path to a YAML/JSON file (see ``load_variable_spec``).
+    resume : bool, optional
+        Skip outputs recorded as complete in the manifest (default is False).
+    verify_checksums : bool, optional
+        Recompute output checksums when resuming (default is False).
+    remap_method : {'comid', 'area_weighted'}, optional
+        Select COMID columns (default) or apply area weights to gridded forcings.
+    weights_file : str, optional
+        Sparse area weights file for 'area_weighted' (built if missing).
+    id_column : str, optional
+        Subbasin ID column of the basin shapefile (default is 'COMID').
+    grid_lon, grid_lat : str, optional
+        Longitude and latitude variable names of gridded forcing files.
+
+    Returns
+    -------
+    list of dict
+        Per-output status entries, as returned by ``remap_rdrs_climate_data``.
 
     Example
     -------
@@ -99,12 +449,167 @@ def remap_rdrs_climate_data_single_year(input_directory, output_directory, input
     ... )
     """
 
-    remap_rdrs_climate_data(input_directory, output_directory, input_basin, input_ddb, year, year)
+    return remap_rdrs_climate_data(input_directory, output_directory, input_basin, input_ddb, year, year,
+                                   workers=workers, retries=retries, time_chunk=time_chunk,
+                                   output_mode=output_mode, output_prefix=output_prefix,
+                                   variable_spec=variable_spec, resume=resume,
+                                   verify_checksums=verify_checksums, remap_method=remap_method,
+                                   weights_file=weights_file, id_column=id_column,
+                                   grid_lon=grid_lon, grid_lat=grid_lat)
+
+def build_comid_index(comid, segid):
+    """
+    Build the index that reorders forcing COMID columns into drainage database order.
+
+    The forcing COMIDs are sorted once and every subbasin ID is located with a
+    binary search, so the cost is O((N_COMID + N_subbasin) log N_COMID) instead
+    of one full scan of the COMID array per subbasin.
+
+    Parameters
+    ----------
+    comid : numpy.ndarray
+        COMID values of the forcing file, in file column order.
+    segid : numpy.ndarray
+        Array of subbasin IDs from the drainage database.
+
+    Returns
+    -------
+    numpy.ndarray
+        Integer array of length ``len(segid)`` such that ``comid[ind] == segid``.
+
+    Raises
+    ------
+    ValueError
+        If a subbasin ID is missing from the forcing COMIDs, or if a subbasin ID
+        matches more than one forcing column.
+
+    Example
+    -------
+    >>> from remap_climate_to_ddb import build_comid_index
+    >>> ind = build_comid_index(forc['COMID'].values, subbasin_ids)
+    >>> data = forc['RDRS_v2.1_P_TT_09944'].values[:, ind]
+    """
+    comid = np.asarray(comid).astype(np.int64)
+    segid = np.asarray(segid).astype(np.int64)
+
+    order = np.argsort(comid, kind='stable')
+    sorted_comid = comid[order]
+
+    # Locate the first and one-past-last occurrence of every subbasin ID
+    left = np.searchsorted(sorted_comid, segid, side='left')
+    right = np.searchsorted(sorted_comid, segid, side='right')
+    counts = right - left
+
+    missing = segid[counts == 0]
+    duplicated = segid[counts > 1]
+    if missing.size or duplicated.size:
+        problems = []
+        if missing.size:
+            problems.append(f"{missing.size} subbasin ID(s) not found in forcing COMIDs "
+                            f"(e.g. {missing[:10].tolist()})")
+        if duplicated.size:
+            problems.append(f"{duplicated.size} subbasin ID(s) matching more than one forcing COMID "
+                            f"(e.g. {duplicated[:10].tolist()})")
+        raise ValueError("Cannot map forcing COMIDs to drainage database: " + "; ".join(problems))
+
+    return order[left]
+
+def _comid_index_key(comid, segid):
+    """Return a hashable key identifying a forcing COMID / subbasin ID pair."""
+    comid = np.ascontiguousarray(comid)
+    segid = np.ascontiguousarray(segid)
+    return (
+        comid.dtype.str, comid.shape, hashlib.sha1(comid.tobytes()).hexdigest(),
+        segid.dtype.str, segid.shape, hashlib.sha1(segid.tobytes()).hexdigest()
+    )
+
+def load_variable_spec(variable_spec=None):
+    """
+    Load and validate a variable specification for the forcing remapping.
+
+    A variable specification maps each input variable name to a dict of options:
+
+    - ``name``: output variable name (default: the input name).
+    - ``multiply``, ``add``: unit conversion, ``output = input * multiply + add``.
+    - ``units``: output ``units`` attribute; ``attrs``: extra output attributes.
+    - ``dtype``: output dtype, e.g. 'f8', 'f4' or 'i2' (default: input dtype).
+    - ``scale_factor``, ``add_offset``: packing parameters, integer dtypes only.
+    - ``fill_value``: output fill value (default: NaN for floats, the netCDF
+      default for integers).
+    - ``zlib``, ``complevel``, ``shuffle``: compression (default: True, 6, True).
+    - ``chunksizes``: storage chunk shape (time, subbasin); a None entry means
+      the full dimension (default: ``DEFAULT_TIME_CHUNKSIZE`` by all subbasins).
+
+    Parameters
+    ----------
+    variable_spec : dict or str, optional
+        The specification, or the path to a YAML (.yaml/.yml) or JSON file
+        holding it. If None (default), ``RDRS_V21_VARIABLES`` is used.
+
+    Returns
+    -------
+    dict[str, dict]
+        Mapping input variable name -> options dict with every option filled in.
 
-def process_file(file_path, segid, lon, lat, output_directory):
+    Raises
+    ------
+    ValueError
+        If a variable has an unknown option, if two variables share an output
+        name, or if packing is requested for a non-integer dtype.
+
+    Example
+    -------
+    >>> from remap_climate_to_ddb import load_variable_spec
+    >>> spec = load_variable_spec({
+    ...     'RDRS_v2.1_P_TT_09944': {'add': 273.15, 'units': 'K', 'dtype': 'f4'},
+    ...     'RDRS_v2.1_P_P0_SFC': {'multiply': 100.0, 'units': 'Pa', 'dtype': 'i2',
+    ...                            'scale_factor': 2.0, 'add_offset': 80000.0},
+    ... })
+    >>> spec = load_variable_spec("path/to/era5_land_spec.yaml")
+    """
+    if variable_spec is None:
+        variable_spec = RDRS_V21_VARIABLES
+    elif isinstance(variable_spec, (str, os.PathLike)):
+        path = os.fspath(variable_spec)
+        with open(path, 'r') as f:
+            if path.lower().endswith(('.yaml', '.yml')):
+                try:
+                    import yaml
+                except ImportError as e:
+                    raise ImportError("PyYAML is required to read YAML variable specifications.") from e
+                variable_spec = yaml.safe_load(f)
+            else:
+                variable_spec = json.load(f)
+
+    spec = {}
+    output_names = set()
+    for var, opts in variable_spec.items():
+        opts = dict(opts or {})
+        unknown = set(opts) - set(_VARIABLE_OPTION_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown option(s) {sorted(unknown)} for variable '{var}'")
+        opts = {**_VARIABLE_OPTION_DEFAULTS, **opts}
+        opts['name'] = opts['name'] or var
+        opts['attrs'] = dict(opts['attrs'] or {})
+        if opts['name'] in output_names:
+            raise ValueError(f"Output variable name '{opts['name']}' is used more than once")
+        output_names.add(opts['name'])
+        packed = opts['scale_factor'] is not None or opts['add_offset'] is not None
+        if packed and (opts['dtype'] is None or np.dtype(opts['dtype']).kind not in 'iu'):
+            raise ValueError(f"Variable '{var}': scale_factor/add_offset packing requires an integer dtype")
+        spec[var] = opts
+    return spec
+
+def process_file(file_path, segid, lon, lat, output_directory, index_cache=None, time_chunk=None,
+                 variable_spec=None, weights=None, grid_lon='lon', grid_lat='lat'):
     """
     Process a single NetCDF file and remap its data to the drainage database (DDB) format.
 
+    The output is written with an unlimited ``time`` dimension. When ``time_chunk``
+    is given, the input is read, reordered and appended to the output
+    ``time_chunk`` time steps at a time, so peak memory depends on the chunk size
+    rather than on the length of the file.
+
     Parameters
     ----------
     file_path : str
@@ -117,7 +622,21 @@ def process_file(file_path, segid, lon, lat, output_directory):
         Array of latitude values from the drainage database.
     output_directory : str
         Path to the directory where the processed file will be saved.
-    
+    index_cache : dict, optional
+        Cache of COMID indices built by ``build_comid_index``. Pass the same dict
+        for every file of a run so the index is built once per forcing grid.
+    time_chunk : int, optional
+        Number of time steps read and written per chunk. If None (default), the
+        whole file is processed as a single chunk.
+    variable_spec : dict or str, optional
+        Variables to remap and how to encode them (see ``load_variable_spec``).
+        Default is the seven RDRS v2.1 variables.
+    weights : scipy.sparse matrix, optional
+        Area weights from ``build_area_weights`` for a gridded forcing file. If
+        None (default), the file must hold one column per COMID.
+    grid_lon, grid_lat : str, optional
+        Longitude and latitude variable names of a gridded forcing file.
+
     Example
     -------
     >>> from remap_climate_to_ddb import process_file
@@ -126,75 +645,362 @@ def process_file(file_path, segid, lon, lat, output_directory):
     ...     segid=subbasin_ids,
     ...     lon=longitudes,
     ...     lat=latitudes,
-    ...     output_directory="path/to/output"
+    ...     output_directory="path/to/output",
+    ...     time_chunk=744
     ... )
     """
-    print(f"Started processing file: {file_path}")
-    forc = xs.open_dataset(file_path)
-
-    # Extract indices of forcing IDs based on the drainage database
-    ind = []
-    for i in range(len(segid)):
-        fid = np.where(np.int32(forc['COMID'].values) == segid[i])[0]
-        ind = np.append(ind, fid)
-    ind = np.int32(ind)
-
-    # Create a new dataset with data ordered as needed
-    forc_vec = xs.Dataset()
-    variables_to_process = ['RDRS_v2.1_A_PR0_SFC', 'RDRS_v2.1_P_P0_SFC', 'RDRS_v2.1_P_HU_09944', 
-                            'RDRS_v2.1_P_TT_09944', 'RDRS_v2.1_P_FB_SFC', 'RDRS_v2.1_P_FI_SFC', 'RDRS_v2.1_P_UVC_09944']
-    for var in variables_to_process:
-        data = forc[var].values[:, ind]
-        forc_vec[var] = (("time", "subbasin"), data)
-        forc_vec[var].attrs = forc[var].attrs
-
-    # Correctly setting coordinates:
-    forc_vec = forc_vec.assign_coords(
-        time=forc['time'].values,
-        lon=(['subbasin'], lon[ind]),
-        lat=(['subbasin'], lat[ind])
-    )
-    forc_vec['lon'].attrs = {
-        'long_name': 'longitude',
-        'units': 'degrees_east'
-    }
-    forc_vec['lat'].attrs = {
-        'long_name': 'latitude',
-        'units': 'degrees_north'
-    }
+    output_path = _modified_output_path(file_path, output_directory)
+    process_files([file_path], output_path, segid, lon, lat, index_cache=index_cache, time_chunk=time_chunk,
+                  variable_spec=variable_spec, weights=weights, grid_lon=grid_lon, grid_lat=grid_lat)
 
-    # Metadata and attributes
-    forc_vec.attrs.update({
-        'Conventions': 'CF-1.6',
-        'history': 'Processed on Apr 06, 2024',
-        'License': 'The data were written by Fuad Yassin.',
-        'featureType': 'timeSeries'
+def process_files(file_paths, output_path, segid, lon, lat, index_cache=None, time_chunk=None,
+                  variable_spec=None, weights=None, grid_lon='lon', grid_lat='lat'):
+    """
+    Remap a sequence of NetCDF files into one time-continuous drainage database (DDB) forcing file.
+
+    The files are appended, in the given order, to a single output with an
+    unlimited ``time`` dimension, so a year or a whole period of forcing is
+    written in one pass without a separate concatenation step. Time units,
+    variable attributes and encoding are taken from the first file. The output
+    is written to ``<output_path>.part`` and only renamed to ``output_path``
+    once every file has been appended, so an interrupted run never leaves a
+    partial file under the final name.
+
+    Parameters
+    ----------
+    file_paths : list of str
+        Paths to the input NetCDF files, in time order.
+    output_path : str
+        Path of the output NetCDF file.
+    segid : numpy.ndarray
+        Array of subbasin IDs from the drainage database.
+    lon : numpy.ndarray
+        Array of longitude values from the drainage database.
+    lat : numpy.ndarray
+        Array of latitude values from the drainage database.
+    index_cache : dict, optional
+        Cache of COMID indices built by ``build_comid_index``.
+    time_chunk : int, optional
+        Number of time steps read and written per chunk. If None (default), each
+        input file is processed as a single chunk.
+    variable_spec : dict or str, optional
+        Variables to remap and how to encode them (see ``load_variable_spec``).
+        Default is the seven RDRS v2.1 variables.
+    weights : scipy.sparse matrix, optional
+        Area weights from ``build_area_weights``, shape (n_subbasin, n_cells).
+        If given, the inputs are treated as gridded forcings and each time step
+        is remapped as ``weights @ values``; otherwise (default) the inputs must
+        hold one column per COMID.
+    grid_lon, grid_lat : str, optional
+        Longitude and latitude variable names of gridded forcing files, used to
+        find the spatial dimensions (default is 'lon' and 'lat').
+
+    Raises
+    ------
+    ValueError
+        If the time steps of a file do not start after those already written,
+        or if ``weights`` does not match the forcing grid.
+
+    Example
+    -------
+    >>> from remap_climate_to_ddb import process_files
+    >>> process_files(
+    ...     file_paths=["path/to/input_2000_01.nc", "path/to/input_2000_02.nc"],
+    ...     output_path="path/to/output/forcing_2000.nc",
+    ...     segid=subbasin_ids,
+    ...     lon=longitudes,
+    ...     lat=latitudes,
+    ...     time_chunk=744
+    ... )
+    """
+    variable_spec = load_variable_spec(variable_spec)
+
+    tmp_path = output_path + '.part'
+    out = None
+    last_time = None
+    try:
+        for file_path in file_paths:
+            print(f"Started processing file: {file_path}")
+            forc = xs.open_dataset(file_path)
+            try:
+                if weights is None:
+                    ind = _get_comid_index(forc['COMID'].values, segid, index_cache)
+                    remap = lambda values: values.values[:, ind]
+                else:
+                    spatial_dims = _spatial_dims(forc, grid_lon, grid_lat)
+                    n_cells = int(np.prod([forc.sizes[dim] for dim in spatial_dims]))
+                    if weights.shape != (len(segid), n_cells):
+                        raise ValueError(f"Area weights of shape {weights.shape} do not match "
+                                         f"{len(segid)} subbasins and {n_cells} grid cells of {file_path}")
+                    remap = lambda values: _apply_area_weights(values, weights, spatial_dims)
+                if out is None:
+                    out = _create_output(tmp_path, forc, variable_spec, segid, lon, lat)
+
+                times = forc['time'].values
+                n_time = len(times)
+                if last_time is not None and n_time and not times[0] > last_time:
+                    raise ValueError(f"Time steps of {file_path} start at {times[0]}, "
+                                     f"not after the last time already written ({last_time})")
+
+                # Append to the output one time chunk at a time
+                step = time_chunk if time_chunk else max(n_time, 1)
+                for t0 in range(0, n_time, step):
+                    chunk = forc.isel(time=slice(t0, t0 + step))
+                    data = {opts['name']: _convert_units(remap(chunk[var]), opts)
+                            for var, opts in variable_spec.items()}
+                    _append_time_chunk(out, chunk['time'].values, data)
+                if n_time:
+                    last_time = times[-1]
+            finally:
+                forc.close()
+            print(f"Finished processing file: {file_path}")
+        if out is not None:
+            out.close()
+            out = None
+            os.replace(tmp_path, output_path)
+    finally:
+        if out is not None:
+            out.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print(f"Processed and saved: {output_path}")
+
+def build_area_weights(forcing_file, basin, segid, id_column='COMID', grid_lon='lon', grid_lat='lat',
+                       area_crs='EPSG:6933'):
+    """
+    Build sparse area weights that remap a gridded forcing to drainage database subbasins.
+
+    Each forcing grid cell is turned into a polygon, the polygons are intersected
+    with the basin polygons once, and the overlap areas (in an equal-area CRS)
+    are stored as a sparse matrix. Rows follow the drainage database order and
+    are normalized to sum to 1, so ``weights @ values`` gives the area-weighted
+    mean of the cells covering each subbasin. Save the result with
+    ``scipy.sparse.save_npz`` to reuse it for every forcing file on the same grid.
+
+    Parameters
+    ----------
+    forcing_file : str
+        Path to a gridded forcing NetCDF file. Its longitude and latitude may be
+        1D (regular grid) or 2D (curvilinear, e.g. rotated-pole RDRS).
+    basin : gpd.GeoDataFrame
+        Basin polygons with a subbasin ID column.
+    segid : numpy.ndarray
+        Array of subbasin IDs from the drainage database.
+    id_column : str, optional
+        Column of ``basin`` holding the subbasin IDs (default is 'COMID').
+    grid_lon, grid_lat : str, optional
+        Longitude and latitude variable names in the forcing file.
+    area_crs : str, optional
+        Equal-area CRS used for the overlap areas (default is 'EPSG:6933').
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix, shape (len(segid), n_cells)
+        Overlap fractions; cells are numbered in C order over the spatial
+        dimensions of ``grid_lat``.
+
+    Raises
+    ------
+    ValueError
+        If a subbasin is missing from ``basin`` or does not overlap the grid.
+
+    Example
+    -------
+    >>> from scipy import sparse
+    >>> from remap_climate_to_ddb import build_area_weights
+    >>> weights = build_area_weights("path/to/era5_2000.nc", gpd.read_file("path/to/basin.shp"),
+    ...                              subbasin_ids, grid_lon="longitude", grid_lat="latitude")
+    >>> sparse.save_npz("path/to/area_weights.npz", weights)
+    """
+    forc = xs.open_dataset(forcing_file)
+    grid_lon_values = forc[grid_lon].values
+    grid_lat_values = forc[grid_lat].values
+    forc.close()
+
+    cells = gpd.GeoSeries(_grid_cell_polygons(grid_lon_values, grid_lat_values), crs='EPSG:4326')
+    cells = cells.to_crs(area_crs)
+    basin = basin.to_crs(area_crs)
+
+    # Basin polygons in drainage database order
+    rows = build_comid_index(basin[id_column].values, segid)
+    polygons = np.asarray(basin.geometry)[rows]
+
+    poly_idx, cell_idx = cells.sindex.query(polygons, predicate='intersects')
+    areas = shapely.area(shapely.intersection(polygons[poly_idx], np.asarray(cells)[cell_idx]))
+    keep = areas > 0
+    weights = sparse.csr_matrix((areas[keep], (poly_idx[keep], cell_idx[keep])),
+                                shape=(len(segid), len(cells)))
+
+    row_sums = np.asarray(weights.sum(axis=1)).ravel()
+    uncovered = np.asarray(segid)[row_sums == 0]
+    if uncovered.size:
+        raise ValueError(f"{uncovered.size} subbasin(s) do not overlap the forcing grid "
+                         f"(e.g. {uncovered[:10].tolist()})")
+    return sparse.diags(1.0 / row_sums) @ weights
+
+def _grid_cell_polygons(grid_lon, grid_lat):
+    """
+    Return one polygon per grid cell, in C order, from cell-centre longitudes and latitudes.
+
+    Cell corners are the mean of the four surrounding centres, with the grid
+    extended by linear extrapolation at its edges. Longitudes above 180 are
+    shifted to the -180..180 range cell by cell.
+    """
+    if grid_lon.ndim == 1 and grid_lat.ndim == 1:
+        grid_lon, grid_lat = np.meshgrid(grid_lon, grid_lat)
+    corner_lon = _cell_corners(np.asarray(grid_lon, dtype=float))
+    corner_lat = _cell_corners(np.asarray(grid_lat, dtype=float))
+
+    ring_lon = np.stack([corner_lon[:-1, :-1], corner_lon[:-1, 1:], corner_lon[1:, 1:], corner_lon[1:, :-1]], axis=-1)
+    ring_lat = np.stack([corner_lat[:-1, :-1], corner_lat[:-1, 1:], corner_lat[1:, 1:], corner_lat[1:, :-1]], axis=-1)
+    ring_lon = ring_lon.reshape(-1, 4)
+    ring_lon = ring_lon - 360.0 * (ring_lon.mean(axis=1, keepdims=True) > 180.0)
+    coords = np.stack([ring_lon, ring_lat.reshape(-1, 4)], axis=-1)
+    return shapely.polygons(coords)
+
+def _cell_corners(centres):
+    """Return the (ny + 1, nx + 1) corner values of a (ny, nx) array of cell centres."""
+    if min(centres.shape) < 2:
+        raise ValueError("Area weighting needs a forcing grid of at least 2 x 2 cells")
+    padded = np.vstack([2 * centres[:1] - centres[1:2], centres, 2 * centres[-1:] - centres[-2:-1]])
+    padded = np.hstack([2 * padded[:, :1] - padded[:, 1:2], padded, 2 * padded[:, -1:] - padded[:, -2:-1]])
+    return 0.25 * (padded[:-1, :-1] + padded[1:, :-1] + padded[:-1, 1:] + padded[1:, 1:])
+
+def _spatial_dims(forc, grid_lon, grid_lat):
+    """Return the spatial dimension names of a gridded forcing, in cell numbering order."""
+    if forc[grid_lat].ndim == 1 and forc[grid_lon].ndim == 1:
+        return (forc[grid_lat].dims[0], forc[grid_lon].dims[0])
+    return forc[grid_lat].dims
+
+def _apply_area_weights(values, weights, spatial_dims):
+    """Remap a (time, *spatial_dims) DataArray block to (time, subbasin) with the area weights."""
+    block = values.transpose('time', *spatial_dims).values
+    block = block.reshape(block.shape[0], -1)
+    return np.asarray(weights @ block.T).T
+
+def _modified_output_path(file_path, output_directory):
+    """Return the per-file output path ``<output_directory>/<name>_modified.nc``."""
+    return os.path.join(output_directory, os.path.basename(file_path).replace('.nc', '_modified.nc'))
+
+def _get_comid_index(comid, segid, index_cache):
+    """Return the COMID index for a forcing file, using ``index_cache`` when given."""
+    if index_cache is None:
+        return build_comid_index(comid, segid)
+    key = _comid_index_key(comid, segid)
+    if key not in index_cache:
+        index_cache[key] = build_comid_index(comid, segid)
+    return index_cache[key]
+
+def _convert_units(values, opts):
+    """Apply the ``multiply``/``add`` unit conversion of a variable's options."""
+    if opts['multiply'] != 1.0:
+        values = values * opts['multiply']
+    if opts['add'] != 0.0:
+        values = values + opts['add']
+    return values
+
+def _create_output(output_path, forc, variable_spec, segid, lon, lat):
+    """
+    Create a remapped forcing file with an unlimited time dimension and return the open dataset.
+
+    Time units and calendar are taken from the encoding of the input time
+    variable, variable attributes are copied from the input file, and output
+    names, dtypes and encodings follow ``variable_spec``.
+    """
+    time_encoding = forc['time'].encoding
+    out = netCDF4.Dataset(output_path, 'w', format='NETCDF4')
+    out.createDimension('time', None)
+    out.createDimension('subbasin', len(segid))
+
+    time_var = out.createVariable('time', 'f8', ('time',))
+    time_var.setncatts({
+        'standard_name': 'time',
+        'units': time_encoding.get('units', 'hours since 1900-01-01 00:00:00'),
+        'calendar': time_encoding.get('calendar', 'standard')
     })
 
+    # Define a variable for the points and set the 'timeseries_id'
+    subbasin_var = out.createVariable('subbasin', np.asarray(segid).dtype, ('subbasin',))
+    subbasin_var.setncatts({'long_name': 'shape_id', 'units': '1', 'cf_role': 'timeseries_id'})
+    subbasin_var[:] = segid
+
+    lon_var = out.createVariable('lon', 'f8', ('subbasin',))
+    lon_var.setncatts({'long_name': 'longitude', 'units': 'degrees_east'})
+    lon_var[:] = lon
+    lat_var = out.createVariable('lat', 'f8', ('subbasin',))
+    lat_var.setncatts({'long_name': 'latitude', 'units': 'degrees_north'})
+    lat_var[:] = lat
+
     # Define coordinate system
-    forc_vec['crs'] = xs.DataArray(np.int32(1), attrs={
+    crs_var = out.createVariable('crs', 'i4')
+    crs_var.setncatts({
         'grid_mapping_name': 'latitude_longitude',
         'longitude_of_prime_meridian': 0.0,
         'semi_major_axis': 6378137.0,
         'inverse_flattening': 298.257223563
     })
+    crs_var.assignValue(1)
 
-    # Define a variable for the points and set the 'timeseries_id'
-    forc_vec['subbasin'] = xs.DataArray(segid, dims=['subbasin'])
-    forc_vec['subbasin'].attrs.update({
-        'long_name': 'shape_id',
-        'units': '1',
-        'cf_role': 'timeseries_id'
+    for var, opts in variable_spec.items():
+        dtype = np.dtype(opts['dtype']) if opts['dtype'] is not None else forc[var].dtype
+        fill_value = opts['fill_value']
+        if fill_value is None:
+            if dtype.kind == 'f':
+                fill_value = np.nan
+            elif dtype.kind in 'iu':
+                fill_value = netCDF4.default_fillvals[dtype.str[1:]]
+        chunksizes = opts['chunksizes'] or (DEFAULT_TIME_CHUNKSIZE, None)
+        chunksizes = tuple(size or full for size, full in zip(chunksizes, (DEFAULT_TIME_CHUNKSIZE, len(segid))))
+        data_var = out.createVariable(opts['name'], dtype, ('time', 'subbasin'), zlib=opts['zlib'],
+                                      complevel=opts['complevel'], shuffle=opts['shuffle'],
+                                      chunksizes=chunksizes, fill_value=fill_value)
+        attrs = {k: v for k, v in forc[var].attrs.items()
+                 if k not in ('_FillValue', 'scale_factor', 'add_offset')}
+        if opts['units'] is not None:
+            attrs['units'] = opts['units']
+        if opts['scale_factor'] is not None:
+            attrs['scale_factor'] = opts['scale_factor']
+        if opts['add_offset'] is not None:
+            attrs['add_offset'] = opts['add_offset']
+        attrs.update(opts['attrs'])
+        attrs['coordinates'] = 'lon lat'
+        data_var.setncatts(attrs)
+
+    # Metadata and attributes
+    out.setncatts({
+        'Conventions': 'CF-1.6',
+        'history': 'Processed on Apr 06, 2024',
+        'License': 'The data were written by Fuad Yassin.',
+        'featureType': 'timeSeries'
     })
+    return out
 
-    # Save to netCDF
-    output_path = os.path.join(output_directory, os.path.basename(file_path).replace('.nc', '_modified.nc'))
-    encoding = {var: {'zlib': True, 'complevel': 6} for var in forc_vec.data_vars}
-    forc_vec.to_netcdf(output_path, encoding=encoding)
-    print(f"Processed and saved: {output_path}")
+def _append_time_chunk(out, times, data):
+    """
+    Append a block of time steps to an output created by ``_create_output``.
 
-    forc.close()
-    print(f"Finished processing file: {file_path}")
+    Parameters
+    ----------
+    out : netCDF4.Dataset
+        Open output dataset.
+    times : numpy.ndarray
+        Decoded time values (datetime64 or cftime) of the block.
+    data : dict[str, numpy.ndarray]
+        Mapping output variable name -> array of shape (len(times), n_subbasin).
+    """
+    time_var = out.variables['time']
+    times = np.asarray(times)
+    if np.issubdtype(times.dtype, np.datetime64):
+        times = times.astype('datetime64[us]').tolist()
+    t0 = len(out.dimensions['time'])
+    t1 = t0 + len(times)
+    time_var[t0:t1] = netCDF4.date2num(times, time_var.units, time_var.calendar)
+    for var, values in data.items():
+        data_var = out.variables[var]
+        if data_var.dtype.kind in 'iu':
+            # Mask NaNs so integer (packed) variables receive their fill value
+            values = np.ma.masked_invalid(values)
+        data_var[t0:t1, :] = values
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Process RDRS climate data.")
@@ -207,6 +1013,23 @@ if __name__ == "__main__":
     all_years_parser.add_argument("--input_ddb", required=True, help="Path to the drainage database NetCDF file.")
     all_years_parser.add_argument("--start_year", type=int, required=True, help="Start year of the data to process.")
     all_years_parser.add_argument("--end_year", type=int, required=True, help="End year of the data to process.")
+    all_years_parser.add_argument("--workers", type=int, default=1, help="Number of worker processes.")
+    all_years_parser.add_argument("--retries", type=int, default=0, help="Retries for a failed file.")
+    all_years_parser.add_argument("--time_chunk", type=int, default=None, help="Time steps read and written per chunk.")
+    all_years_parser.add_argument("--output_mode", choices=["per_file", "yearly", "merged"], default="per_file",
+                                  help="Write one output per input file, per year, or for the whole period.")
+    all_years_parser.add_argument("--output_prefix", default="remapped_forcing", help="Prefix of yearly/merged outputs.")
+    all_years_parser.add_argument("--variable_spec", default=None,
+                                  help="YAML/JSON file with the variables to remap and their encoding.")
+    all_years_parser.add_argument("--resume", action="store_true", help="Skip outputs completed by an earlier run.")
+    all_years_parser.add_argument("--verify_checksums", action="store_true",
+                                  help="Recompute output checksums when resuming.")
+    all_years_parser.add_argument("--remap_method", choices=["comid", "area_weighted"], default="comid",
+                                  help="Select COMID columns or area-weight gridded forcings.")
+    all_years_parser.add_argument("--weights_file", default=None, help="Sparse area weights file (.npz).")
+    all_years_parser.add_argument("--id_column", default="COMID", help="Subbasin ID column of the basin shapefile.")
+    all_years_parser.add_argument("--grid_lon", default="lon", help="Longitude variable of gridded forcings.")
+    all_years_parser.add_argument("--grid_lat", default="lat", help="Latitude variable of gridded forcings.")
 
     single_year_parser = subparsers.add_parser("single_year", help="Process data for a single year.")
     single_year_parser.add_argument("--input_directory", required=True, help="Path to the input directory.")
@@ -214,6 +1037,23 @@ if __name__ == "__main__":
     single_year_parser.add_argument("--input_basin", required=True, help="Path to the basin shapefile.")
     single_year_parser.add_argument("--input_ddb", required=True, help="Path to the drainage database NetCDF file.")
     single_year_parser.add_argument("--year", type=int, required=True, help="Year of the data to process.")
+    single_year_parser.add_argument("--workers", type=int, default=1, help="Number of worker processes.")
+    single_year_parser.add_argument("--retries", type=int, default=0, help="Retries for a failed file.")
+    single_year_parser.add_argument("--time_chunk", type=int, default=None, help="Time steps read and written per chunk.")
+    single_year_parser.add_argument("--output_mode", choices=["per_file", "yearly", "merged"], default="per_file",
+                                    help="Write one output per input file or one for the year.")
+    single_year_parser.add_argument("--output_prefix", default="remapped_forcing", help="Prefix of yearly/merged outputs.")
+    single_year_parser.add_argument("--variable_spec", default=None,
+                                    help="YAML/JSON file with the variables to remap and their encoding.")
+    single_year_parser.add_argument("--resume", action="store_true", help="Skip outputs completed by an earlier run.")
+    single_year_parser.add_argument("--verify_checksums", action="store_true",
+                                    help="Recompute output checksums when resuming.")
+    single_year_parser.add_argument("--remap_method", choices=["comid", "area_weighted"], default="comid",
+                                    help="Select COMID columns or area-weight gridded forcings.")
+    single_year_parser.add_argument("--weights_file", default=None, help="Sparse area weights file (.npz).")
+    single_year_parser.add_argument("--id_column", default="COMID", help="Subbasin ID column of the basin shapefile.")
+    single_year_parser.add_argument("--grid_lon", default="lon", help="Longitude variable of gridded forcings.")
+    single_year_parser.add_argument("--grid_lat", default="lat", help="Latitude variable of gridded forcings.")
 
     args = parser.parse_args()
 
@@ -224,7 +1064,20 @@ if __name__ == "__main__":
             args.input_basin,
             args.input_ddb,
             args.start_year,
-            args.end_year
+            args.end_year,
+            workers=args.workers,
+            retries=args.retries,
+            time_chunk=args.time_chunk,
+            output_mode=args.output_mode,
+            output_prefix=args.output_prefix,
+            variable_spec=args.variable_spec,
+            resume=args.resume,
+            verify_checksums=args.verify_checksums,
+            remap_method=args.remap_method,
+            weights_file=args.weights_file,
+            id_column=args.id_column,
+            grid_lon=args.grid_lon,
+            grid_lat=args.grid_lat
         )
     elif args.command == "single_year":
         remap_rdrs_climate_data_single_year(
@@ -232,5 +1085,18 @@ if __name__ == "__main__":
             args.output_directory,
             args.input_basin,
             args.input_ddb,
-            args.year
+            args.year,
+            workers=args.workers,
+            retries=args.retries,
+            time_chunk=args.time_chunk,
+            output_mode=args.output_mode,
+            output_prefix=args.output_prefix,
+            variable_spec=args.variable_spec,
+            resume=args.resume,
+            verify_checksums=args.verify_checksums,
+            remap_method=args.remap_method,
+            weights_file=args.weights_file,
+            id_column=args.id_column,
+            grid_lon=args.grid_lon,
+            grid_lat=args.grid_lat
         )